@@ -0,0 +1,250 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# The benchmarks can be run as a script, without the report generator in the PYTHONPATH
+REPO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, REPO_PATH)
+
+from src.common.config import eprint
+from src.common.timeseries import Timeseries
+from src.standin.opentsdb import OpenTSDBStandin, SyntheticWorkload
+
+# Microbenchmarks of the analysis hot paths on synthetic series, the results are written as JSON along with the commit
+# they were obtained at, so that two runs can be compared with '--compare'
+EXPERIMENT_NAME = "_microbenchmarks"
+DOWNSAMPLE = 5
+START = 1600000000
+
+CONFIG = """[DEFAULT]
+NODES_LIST = "cont0"
+APPS_LIST = "app0"
+USERS_LIST = "user0"
+REPORTED_RESOURCES = "cpu,accounting,tasks"
+EXPERIMENT_TYPE = "greedy"
+PLOTTING_FORMATS = "png"
+STATIC_LIMITS = false
+YTICKS_STEP = "cpu:100,accounting:5,tasks:1"
+XTICKS_STEP = 100000
+DOWNSAMPLE = {0}
+PLOTTING_WORKERS = 1
+INCREMENTAL_PLOTS = false
+""".format(DOWNSAMPLE)
+
+
+def get_config(output_path):
+    from src.common.config import Config
+    config_path = os.path.join(output_path, "report_generator_config.ini")
+    with open(config_path, "w") as f:
+        f.write(CONFIG)
+    return Config(EXPERIMENT_NAME, config_path)
+
+
+def get_timeseries(size, metric_name="structure.cpu.used", structure_name="cont0"):
+    timestamps, values = SyntheticWorkload(DOWNSAMPLE).get_series(metric_name, structure_name, START,
+                                                                   START + (size - 1) * DOWNSAMPLE)
+    # Leave some gaps so that the missing data check finds something
+    gaps = np.zeros(size, dtype=bool)
+    gaps[np.arange(size // 100) * 100 + 50] = True
+    return Timeseries(timestamps[~gaps], values[~gaps])
+
+
+def bench_aggregate_metrics(size, cfg):
+    from src.opentsdb.bdwatchdog import BDWatchdog
+    timeseries = get_timeseries(size)
+    start, end = int(timeseries.timestamps[0]), int(timeseries.timestamps[-1])
+    return lambda: BDWatchdog.aggregate_metrics(start, end, {"structure.cpu.used": timeseries})
+
+
+def bench_check_for_missing_metric_info(size, cfg):
+    from src.opentsdb.bdwatchdog import BDWatchdog
+    timeseries = get_timeseries(size)
+    return lambda: BDWatchdog.perform_check_for_missing_metric_info(timeseries, cfg.MAX_DIFF_TIME)
+
+
+def bench_timeseries_range_apply(size, cfg):
+    from src.opentsdb.bdwatchdog import BDWatchdog
+    timeseries = get_timeseries(size)
+    # The values are clipped in place, so every run clips a fresh copy of the series, made outside of the timing
+    return lambda series: BDWatchdog.perform_timeseries_range_apply(series, 0, 300), timeseries.copy
+
+
+def bench_generate_resources_timeseries(size, cfg):
+    # The 'size' points are split between all the retrieved series, the responses of the queries are computed
+    # beforehand by the OpenTSDB stand-in, so that only their parsing and the analysis are measured
+    from src.common import utils
+    from src.opentsdb import bdwatchdog
+    num_series = len(cfg.NODES_LIST) * len(cfg.BDWATCHDOG_NODE_METRICS) + \
+        len(cfg.APPS_LIST) * len(cfg.BDWATCHDOG_APP_METRICS) + len(cfg.USERS_LIST) * len(cfg.BDWATCHDOG_USER_METRICS)
+    duration = max(1, size // num_series) * DOWNSAMPLE
+    test = dict(test_name="0.test", experiment_id=EXPERIMENT_NAME, start_time=START, end_time=START + duration)
+
+    standin = OpenTSDBStandin(SyntheticWorkload(DOWNSAMPLE))
+    responses = dict()
+
+    def get_points(query, tries=3):
+        key = json.dumps(query, sort_keys=True)
+        if key not in responses:
+            responses[key] = standin.answer(query)
+        return responses[key]
+
+    bdw = bdwatchdog.get_client()
+    bdw.get_points = get_points
+    bdw.cache = None
+    utils.generate_resources_timeseries(dict(test), cfg)
+    standin.server.server_close()
+    return lambda: utils.generate_resources_timeseries(dict(test), cfg)
+
+
+def bench_plot_test_doc(size, cfg):
+    from src.common.utils import get_plots_metrics
+    from src.lineplotting.lineplots import plot_test_doc
+    plots = get_plots_metrics()["node"][cfg.EXPERIMENT_TYPE]
+    timeseries = dict()
+    for metric in plots["cpu"]:
+        timeseries[metric[0]] = get_timeseries(size // len(plots["cpu"]), metric[0])
+    test = dict(test_name="0.test", start_time=START, end_time=START + size * DOWNSAMPLE,
+                timeseries={"cont0": timeseries})
+    return lambda: plot_test_doc(test, "cont0", plots, cfg)
+
+
+BENCHMARKS = {
+    "aggregate_metrics": bench_aggregate_metrics,
+    "check_for_missing_metric_info": bench_check_for_missing_metric_info,
+    "timeseries_range_apply": bench_timeseries_range_apply,
+    "generate_resources_timeseries": bench_generate_resources_timeseries,
+    "plot_test_doc": bench_plot_test_doc,
+}
+
+# Largest sizes run by default, as rendering the biggest plots takes minutes
+SIZE_LIMITS = {"plot_test_doc": 1000000}
+
+
+def get_commit():
+    try:
+        commit = subprocess.check_output(["git", "-C", REPO_PATH, "rev-parse", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "-C", REPO_PATH, "status", "--porcelain", "--untracked-files=no"],
+                                             text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def measure(benchmark, repeat, min_time):
+    # Run the function at least 'repeat' times and, for the fast ones, until 'min_time' seconds have passed
+    # A benchmark may also be a (function, setup) pair, then the untimed 'setup' gives the argument of every run
+    function, setup = benchmark if isinstance(benchmark, tuple) else (benchmark, None)
+    times = list()
+    while len(times) < repeat or sum(times) < min_time:
+        if setup:
+            argument = setup()
+            start = time.perf_counter()
+            function(argument)
+        else:
+            start = time.perf_counter()
+            function()
+        times.append(time.perf_counter() - start)
+        if len(times) >= 1000:
+            break
+    return dict(runs=len(times), best=min(times), mean=sum(times) / len(times))
+
+
+def run_benchmarks(names, sizes, repeat, min_time, size_limits=True, verbose=False):
+    results = list()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_path:
+        # The config and the plots are saved to a temporary directory
+        cfg = get_config(output_path)
+        os.chdir(output_path)
+        try:
+            for name in names:
+                for size in sizes:
+                    if size_limits and size > SIZE_LIMITS.get(name, size):
+                        eprint("Skipping {0} with {1} points, use --no-size-limits to run it".format(name, size))
+                        continue
+                    result = dict(benchmark=name, size=size)
+                    # The messages of the benchmarked functions are hidden unless asked for
+                    with open(os.devnull, "w") as devnull:
+                        with contextlib.nullcontext() if verbose else contextlib.redirect_stderr(devnull):
+                            result.update(measure(BENCHMARKS[name](size, cfg), repeat, min_time))
+                    eprint("{benchmark} with {size} points: best {best:.6f} seconds, mean {mean:.6f} seconds "
+                           "({runs} runs)".format(**result))
+                    results.append(result)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def compare_results(old_path, new_path):
+    with open(old_path, "r") as f:
+        old = json.load(f)
+    with open(new_path, "r") as f:
+        new = json.load(f)
+    old_results = {(r["benchmark"], r["size"]): r for r in old["results"]}
+    print("Comparing {0} ({1}) with {2} ({3})".format(old_path, old["commit"], new_path, new["commit"]))
+    print("{0:<32} {1:>10} {2:>12} {3:>12} {4:>8}".format("benchmark", "size", "old best", "new best", "speedup"))
+    for r in new["results"]:
+        key = (r["benchmark"], r["size"])
+        if key not in old_results:
+            continue
+        old_best = old_results[key]["best"]
+        print("{0:<32} {1:>10} {2:>12.6f} {3:>12.6f} {4:>7.2f}x".format(r["benchmark"], r["size"], old_best,
+                                                                        r["best"], old_best / r["best"]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the analysis hot paths")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--sizes", type=lambda s: int(float(s)), nargs="+",
+                        default=[1000, 10000, 100000, 1000000, 10000000], help="Number of points (e.g., 1e5)")
+    parser.add_argument("--repeat", type=int, default=3, help="Minimum number of runs of each benchmark")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent running each benchmark")
+    parser.add_argument("--no-size-limits", dest="size_limits", action="store_false",
+                        help="Run every benchmark with all the sizes")
+    parser.add_argument("--verbose", action="store_true", help="Show the messages of the benchmarked functions")
+    parser.add_argument("--output", default="microbenchmarks.json", help="File the results are written to")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+    else:
+        commit, dirty = get_commit()
+        results = run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.min_time, args.size_limits,
+                                 args.verbose)
+        with open(args.output, "w") as f:
+            json.dump(dict(commit=commit, dirty=dirty, date=time.strftime("%Y-%m-%d %H:%M:%S"),
+                           python=platform.python_version(), numpy=np.__version__, results=results), f, indent=2)
+        eprint("Results written to '{0}'".format(args.output))
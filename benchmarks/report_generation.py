@@ -0,0 +1,127 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import tempfile
+import sys
+import time
+
+# The benchmark can be run as a script, without the report generator in the PYTHONPATH
+REPO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, REPO_PATH)
+
+from src.common.config import eprint
+from src.standin.opentsdb import OpenTSDBStandin, SyntheticWorkload
+from src.standin.timestamps import InMemoryTimestampAgent, generate_experiment
+
+# End to end benchmark of the generation of a report, with the experiment served by the local OpenTSDB and
+# TimestampsSnitch stand-ins, for several numbers of containers, the reports are generated in a temporary directory
+
+CONFIG_TEMPLATE = """[DEFAULT]
+NODES_LIST = "{nodes}"
+APPS_LIST = "{apps}"
+USERS_LIST = "user0"
+REPORTED_RESOURCES = "cpu,accounting,tasks"
+EXPERIMENT_TYPE = "greedy"
+GENERATE_NODES_PLOTS = {plots}
+GENERATE_APP_PLOTS = false
+GENERATE_USER_PLOTS = {plots}
+PLOTTING_FORMATS = "png"
+STATIC_LIMITS = false
+YTICKS_STEP = "cpu:100,accounting:5,tasks:1"
+XTICKS_STEP = 100
+DOWNSAMPLE = {downsample}
+STREAMING_REPORT = {streaming}
+EXPERIMENT_ARCHIVE = false
+AGGREGATES_INDEX = false
+"""
+
+
+def run_benchmark(standin, num_containers, args, reports_path):
+    from src.opentsdb import bdwatchdog
+    from src.ExperimentReporter import ExperimentReporter
+
+    experiment_name = "_benchmark_{0}".format(num_containers)
+    experiment_path = os.path.join(reports_path, experiment_name)
+    config_path = os.path.join(experiment_path, "report_generator_config.ini")
+    os.makedirs(experiment_path, exist_ok=True)
+    with open(config_path, "w") as f:
+        f.write(CONFIG_TEMPLATE.format(
+            nodes=",".join("cont{0}".format(i) for i in range(num_containers)),
+            apps=",".join("app{0}".format(i) for i in range(max(1, num_containers // 10))),
+            plots=str(args.plots).lower(), downsample=args.downsample, streaming=str(args.streaming).lower()))
+
+    agent = InMemoryTimestampAgent()
+    agent.add_experiment(*generate_experiment(experiment_name, num_tests=args.tests, test_duration=args.duration))
+
+    # Every query goes to the stand-in, and without cache so that every run retrieves all the data
+    bdw = bdwatchdog.get_client()
+    bdw.server = standin.url
+    bdw.cache = None
+
+    cwd = os.getcwd()
+    os.chdir(experiment_path)
+    queries, points = standin.queries, standin.points
+    start = time.time()
+    try:
+        with open("{0}.txt".format(experiment_name), "w") as out, open("{0}.log".format(experiment_name), "w") as log:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(log):
+                experiment = agent.get_experiment(experiment_name, "root")
+                ExperimentReporter(experiment_name, agent, config_path).report_experiment(experiment)
+    finally:
+        os.chdir(cwd)
+    elapsed = time.time() - start
+
+    return dict(containers=num_containers, tests=args.tests, duration=args.duration, seconds=round(elapsed, 3),
+                queries=standin.queries - queries, points=standin.points - points,
+                max_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the generation of a report against local stand-ins")
+    parser.add_argument("--containers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--tests", type=int, default=3, help="Number of tests of the experiment")
+    parser.add_argument("--duration", type=int, default=600, help="Duration of each test in seconds")
+    parser.add_argument("--resolution", type=int, default=1, help="Seconds between the points of the raw series")
+    parser.add_argument("--downsample", type=int, default=5)
+    parser.add_argument("--plots", action="store_true", help="Also generate the nodes and users plots")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming report mode")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = list()
+    with OpenTSDBStandin(SyntheticWorkload(args.resolution)) as standin, tempfile.TemporaryDirectory() as reports_path:
+        for num_containers in args.containers:
+            result = run_benchmark(standin, num_containers, args, reports_path)
+            eprint("{containers} containers: {seconds:.2f} seconds, {queries} queries, {points} points, "
+                   "max RSS {max_rss_mb} MiB".format(**result))
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,97 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The report generator is not imported by this script, only by the interpreters it runs
+
+# Startup benchmark, every scenario runs in a fresh interpreter and is checked against a time budget and a list of
+# modules it must not load (e.g., matplotlib for reports without plots), the exit status is 1 if any check fails
+REPORT_GENERATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HEAVY_MODULES = ["matplotlib", "pandas", "requests", "pymongo"]
+
+# Name, code run by the interpreter, budget in seconds and modules that must not be loaded
+SCENARIOS = [
+    ("main_help", "import runpy\nsys.argv = ['main.py', '--help']\n"
+                  "try:\n    runpy.run_path('src/main.py', run_name='__main__')\nexcept SystemExit:\n    pass",
+     0.5, HEAVY_MODULES),
+    ("batch_help", "import runpy\nsys.argv = ['batch.py', '--help']\n"
+                   "try:\n    runpy.run_path('src/batch.py', run_name='__main__')\nexcept SystemExit:\n    pass",
+     1.0, ["matplotlib", "pandas", "pymongo"]),
+    ("report_modules", "import src.ExperimentReporter", 0.5, HEAVY_MODULES),
+    ("opentsdb_client", "import src.ExperimentReporter\nfrom src.common.utils import get_async_client\n"
+                        "get_async_client()", 0.75, ["matplotlib", "pandas", "pymongo"]),
+]
+
+CHILD_TEMPLATE = """
+import json
+import sys
+{code}
+print()
+print(json.dumps([module for module in {modules!r} if module in sys.modules]))
+"""
+
+
+def run_scenario(code, forbidden_modules):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPORT_GENERATOR_PATH,
+                                                                   os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    r = subprocess.run([sys.executable, "-c", CHILD_TEMPLATE.format(code=code, modules=forbidden_modules)],
+                       cwd=REPORT_GENERATOR_PATH, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                       universal_newlines=True, check=True)
+    seconds = time.perf_counter() - start
+    return seconds, json.loads(r.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the startup time of the report generator against a budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each scenario, the median time is used")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results, success = list(), True
+    for name, code, budget, forbidden_modules in SCENARIOS:
+        runs = [run_scenario(code, forbidden_modules) for _ in range(args.repeat)]
+        seconds = statistics.median(run[0] for run in runs)
+        loaded_modules = runs[0][1]
+        passed = seconds <= budget and not loaded_modules
+        success &= passed
+        results.append(dict(scenario=name, seconds=seconds, budget=budget, loaded_modules=loaded_modules,
+                            passed=passed))
+        print("{0}: {1:.3f} seconds (budget {2:.2f}){3} -> {4}".format(
+            name, seconds, budget, ", loaded " + ", ".join(loaded_modules) if loaded_modules else "",
+            "OK" if passed else "FAILED"), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if success else 1)
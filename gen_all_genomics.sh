@@ -1,6 +1,9 @@
+# All the reports are generated by a single process, set WORKERS to generate several of them at once
+source set_pythonpath.sh
+reports=()
 for i in {1..4}; do
-  bash scripts/generate_report.sh "genomics_greedy_${i}" conf/experiments/blockchain/genomics_greedy.ini
-  bash scripts/generate_report.sh "genomics_conservative_${i}" conf/experiments/blockchain/genomics_conservative.ini
-  bash scripts/generate_report.sh "genomics_4fold_${i}" conf/experiments/blockchain/genomics_4fold.ini
+  reports+=(--report "genomics_greedy_${i}" conf/experiments/blockchain/genomics_greedy.ini)
+  reports+=(--report "genomics_conservative_${i}" conf/experiments/blockchain/genomics_conservative.ini)
+  reports+=(--report "genomics_4fold_${i}" conf/experiments/blockchain/genomics_4fold.ini)
 done
-
+python3 src/batch.py --pdf --workers "${WORKERS:-1}" "${reports[@]}"
@@ -1,6 +1,9 @@
+# All the reports are generated by a single process, set WORKERS to generate several of them at once
+source set_pythonpath.sh
+reports=()
 for i in {1..4}; do
-  bash scripts/generate_report.sh "transcode_basic_${i}" conf/experiments/blockchain/transcode_basic.ini
-  bash scripts/generate_report.sh "transcode_greedy_${i}" conf/experiments/blockchain/transcode_greedy.ini
-  bash scripts/generate_report.sh "transcode_4fold_${i}" conf/experiments/blockchain/transcode_4fold.ini
+  reports+=(--report "transcode_basic_${i}" conf/experiments/blockchain/transcode_basic.ini)
+  reports+=(--report "transcode_greedy_${i}" conf/experiments/blockchain/transcode_greedy.ini)
+  reports+=(--report "transcode_4fold_${i}" conf/experiments/blockchain/transcode_4fold.ini)
 done
-
+python3 src/batch.py --pdf --workers "${WORKERS:-1}" "${reports[@]}"
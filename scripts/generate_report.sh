@@ -22,7 +22,8 @@ cp $2 ${OUTPUT_REPORTS_FOLDER}/$1/report_generator_config.ini
 cd ${OUTPUT_REPORTS_FOLDER}/$1
 
 echo "Generating report for experiment $1"
-python3 ${REPORT_GENERATOR_PATH}/src/main.py $1 > $1.txt
+# Any extra argument (e.g., --from-archive) is passed to the report generator
+python3 ${REPORT_GENERATOR_PATH}/src/main.py $1 "${@:3}" > $1.txt
 if [[ $? -eq 0 ]]
 then
     pandoc $1.txt --pdf-engine=xelatex --variable=fontsize:8pt --number-sections --toc --template ${LATEX_TEMPLATE} -o $1.pdf
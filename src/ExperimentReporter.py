@@ -24,21 +24,34 @@
 from __future__ import print_function
 
 import json
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+from src.common.archive import ArchiveWriter, ArchiveReader, get_archive_path
 from src.common.config import Config, MongoDBConfig, eprint
+from src.common.index import index_experiment
+from src.common.tracing import span
 from src.latex.latex_output import print_latex_section, print_basic_doc_info
 from src.TestReporter import TestReporter
-from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
 from src.common.utils import generate_duration
 
 
 class ExperimentReporter:
-    def __init__(self, experiment_name):
-        self.cfg = Config(experiment_name)
-        mongoDBConfig = MongoDBConfig()
-        self.timestampingAgent = MongoDBTimestampAgent(mongoDBConfig.get_config_as_dict())
+    def __init__(self, experiment_name, timestamping_agent=None, config_path=None):
+        with span("load_config"):
+            self.cfg = Config(experiment_name, config_path)
+        # The timestamping agent is only needed (and created if not given) when the tests are retrieved from MongoDB
+        self.timestampingAgent = timestamping_agent
         self.testRepo = TestReporter(self.cfg)
 
+    def get_timestamping_agent(self):
+        if self.timestampingAgent is None:
+            from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
+            mongoDBConfig = MongoDBConfig()
+            self.timestampingAgent = MongoDBTimestampAgent(mongoDBConfig.get_config_as_dict())
+        return self.timestampingAgent
+
     def print_tests_data(self, processed_tests):
         test_reports = [
             ("Tests durations", self.testRepo.print_tests_times, True),
@@ -53,8 +66,9 @@ class ExperimentReporter:
             report_name, report_function, bool_apply = report
             if bool_apply:
                 eprint("Printing data of report '{0}'".format(report_name))
-                print_latex_section("{0}".format(report_name))
-                report_function(processed_tests)
+                with span(report_name, category="table"):
+                    print_latex_section("{0}".format(report_name))
+                    report_function(processed_tests)
 
     def report_experiment(self, experiment):
 
@@ -65,23 +79,98 @@ class ExperimentReporter:
         print_basic_doc_info(experiment)
 
         # Get the experiment tests
-        tests = self.timestampingAgent.get_experiment_tests(experiment["experiment_id"], experiment["username"])
+        with span("get_experiment_tests", category="mongodb"):
+            tests = self.get_timestamping_agent().get_experiment_tests(experiment["experiment_id"],
+                                                                       experiment["username"])
+
+        if self.cfg.EXPERIMENT_ARCHIVE:
+            # Store everything the report is built from, so that it can be generated again without MongoDB or OpenTSDB
+            with ArchiveWriter(get_archive_path(experiment["experiment_id"]), experiment) as archive:
+                processed_tests = self.report_tests(tests, self.testRepo.get_test_data, archive)
+        else:
+            processed_tests = self.report_tests(tests, self.testRepo.get_test_data)
+        self.index_experiment(experiment, processed_tests)
+
+    def report_experiment_from_archive(self, archive_path):
+        eprint("Reading experiment info from archive '{0}'".format(archive_path))
+        with ArchiveReader(archive_path) as archive:
+            print_latex_section("Experiment basic information")
+            print_basic_doc_info(archive.experiment)
 
-        # Get the timeseries and compute durations for the tests
-        processed_tests = list(self.testRepo.get_test_data(test) for test in tests)
+            # The tests in the archive have already been processed, they only have to be read
+            processed_tests = self.report_tests(range(archive.get_num_tests()), archive.get_test)
+            self.index_experiment(archive.experiment, processed_tests)
 
-        # Dump the raw data (e.g., aggregates), aside from the original timeseries
-        for t in processed_tests:
-            # Make a copy of the data
-            dumped_test = t.copy()
-            # Remove the original timeseries
-            del dumped_test["timeseries"]
-            with open('{0}.json'.format(t["test_name"]), 'w') as fp:
-                json.dump(dumped_test, fp, indent=2)
+    def report_tests(self, tests, get_test_data, archive=None):
+        if self.cfg.STREAMING_REPORT:
+            processed_tests = self.stream_tests(tests, get_test_data, archive)
+        else:
+            # Get the timeseries and compute durations for the tests
+            # Tests are retrieved concurrently as they mostly wait on OpenTSDB, 'map' keeps the tests order
+            with ThreadPoolExecutor(max_workers=self.cfg.TEST_RETRIEVAL_WORKERS) as executor:
+                processed_tests = list(executor.map(get_test_data, tests))
+
+            # Dump the raw data (e.g., aggregates), aside from the original timeseries
+            for t in processed_tests:
+                self.dump_test(t, archive)
 
         # Print the basic tests info
         self.print_tests_data(processed_tests)
 
-        if self.cfg.GENERATE_APP_PLOTS or self.cfg.GENERATE_NODES_PLOTS or self.cfg.GENERATE_USER_PLOTS:
+        if self.plots_enabled() and not self.cfg.STREAMING_REPORT:
             eprint("Plotting resource plots")
-            self.testRepo.generate_test_resource_plot(processed_tests)
+            with span("plots", category="matplotlib"):
+                self.testRepo.generate_test_resource_plot(processed_tests)
+        return processed_tests
+
+    def index_experiment(self, experiment, processed_tests):
+        if self.cfg.AGGREGATES_INDEX:
+            with span("aggregates_index"):
+                try:
+                    num_aggregates = index_experiment(experiment, processed_tests, self.cfg.AGGREGATES_INDEX_PATH)
+                    eprint("Indexed {0} aggregates of {1} tests".format(num_aggregates, len(processed_tests)))
+                except sqlite3.Error as e:
+                    eprint("Error indexing the aggregates of the experiment: {0}".format(str(e)))
+
+    def plots_enabled(self):
+        return self.cfg.GENERATE_APP_PLOTS or self.cfg.GENERATE_NODES_PLOTS or self.cfg.GENERATE_USER_PLOTS
+
+    def dump_test(self, test, archive=None):
+        # Make a copy of the data
+        dumped_test = test.copy()
+        # Remove the original timeseries
+        dumped_test.pop("timeseries", None)
+        # The missing data found while retrieving the test is only used for the reports
+        dumped_test.pop("missing_data", None)
+        with open('{0}.json'.format(test["test_name"]), 'w') as fp:
+            json.dump(dumped_test, fp, indent=2)
+
+        # The timeseries are only kept in the archive
+        if archive:
+            archive.add_test(test)
+
+    def stream_tests(self, tests, get_test_data, archive=None):
+        # Tests are retrieved with at most TEST_RETRIEVAL_WORKERS of them in flight and, in their order, dumped,
+        # plotted and stripped of their timeseries, only their aggregates are kept for the reports
+        processed_tests = list()
+        pending = deque()
+        tests = iter(tests)
+        with ThreadPoolExecutor(max_workers=self.cfg.TEST_RETRIEVAL_WORKERS) as executor:
+            for test in tests:
+                pending.append(executor.submit(get_test_data, test))
+                if len(pending) >= self.cfg.TEST_RETRIEVAL_WORKERS:
+                    break
+            while pending:
+                test = pending.popleft().result()
+                next_test = next(tests, None)
+                if next_test is not None:
+                    pending.append(executor.submit(get_test_data, next_test))
+
+                self.dump_test(test, archive)
+                if self.plots_enabled():
+                    eprint("Plotting resource plots of test '{0}'".format(test["test_name"]))
+                    with span("plots", category="matplotlib", test=test["test_name"]):
+                        self.testRepo.generate_test_resource_plot([test])
+                test.pop("timeseries", None)
+                processed_tests.append(test)
+        return processed_tests
@@ -23,10 +23,9 @@
 
 from __future__ import print_function
 
-from src.opentsdb import bdwatchdog
-from src.common.config import OpenTSDBConfig, eprint
+from src.common.config import eprint
+from src.common.tracing import span
 from src.latex.latex_output import latex_print, print_latex_stress, flush_table, print_basic_doc_info
-from src.lineplotting.lineplots import plot_test_doc
 from src.common.utils import generate_duration, translate_metric, format_metric, generate_resources_timeseries, \
     get_plots_metrics
 
@@ -35,36 +34,72 @@ class TestReporter:
     def __init__(self, cfg):
         # Get the config
         self.cfg = cfg
-        self.bdwatchdog_handler = bdwatchdog.BDWatchdog(OpenTSDBConfig())
 
     def get_test_data(self, test):
-        test = generate_duration(test)
-        test = generate_resources_timeseries(test, self.cfg)
+        with span("test", test=test.get("test_name")):
+            test = generate_duration(test)
+            test = generate_resources_timeseries(test, self.cfg)
+            if "end_time" in test and "start_time" in test:
+                # The missing data is computed while the timeseries are available, as they may be dropped afterwards
+                with span("missing_data"):
+                    test["missing_data"] = self.get_missing_data(test)
         return test
 
+    def get_missing_data(self, test):
+        from src.opentsdb.bdwatchdog import BDWatchdog
+        structures_list = self.cfg.NODES_LIST
+        misses = dict()
+        for metric in self.cfg.METRICS_TO_CHECK_FOR_MISSING_DATA:
+            metric_name = metric[0]
+            for structure in structures_list:
+                if metric_name in test["timeseries"][structure]:
+                    timeseries = test["timeseries"][structure][metric_name]
+                else:
+                    timeseries = None
+                if bool(timeseries):
+                    structure_misses_list = BDWatchdog.perform_check_for_missing_metric_info(
+                        timeseries, self.cfg.MAX_DIFF_TIME)
+                    if not structure_misses_list:
+                        continue
+                else:
+                    # No timeseries were retrieved, so it is a 100% lost
+                    structure_misses_list = [{"time": 0, "diff_time": test["duration"]}]
+
+                if metric_name not in misses:
+                    misses[metric_name] = dict()
+                misses[metric_name][structure] = structure_misses_list
+        return misses
+
     def generate_test_resource_plot(self, tests):
+        # Matplotlib is only loaded when there are plots to generate
+        from src.lineplotting.lineplots import get_plot_jobs
+        from src.lineplotting.scheduler import render_plots
         report_type = self.cfg.EXPERIMENT_TYPE
 
+        # Gather all the plots of all the tests and then render them at once
+        jobs = list()
         for test in tests:
             if "end_time" not in test or "start_time" not in test:
-                return
+                continue
 
             plots = get_plots_metrics()
 
             if self.cfg.GENERATE_NODES_PLOTS:
                 test_plots = plots["node"][report_type]
                 for node_name in self.cfg.NODES_LIST:
-                    plot_test_doc(test, node_name, test_plots, self.cfg)
+                    jobs += get_plot_jobs(test, node_name, test_plots, self.cfg)
 
             if self.cfg.GENERATE_APP_PLOTS:
                 app_plots = plots["app"][report_type]
                 for app_name in self.cfg.APPS_LIST:
-                    plot_test_doc(test, app_name, app_plots, self.cfg)
+                    jobs += get_plot_jobs(test, app_name, app_plots, self.cfg)
 
             if self.cfg.GENERATE_USER_PLOTS:
                 user_plots = plots["user"][report_type]
                 for user_name in self.cfg.USERS_LIST:
-                    plot_test_doc(test, user_name, user_plots, self.cfg)
+                    jobs += get_plot_jobs(test, user_name, user_plots, self.cfg)
+
+        render_plots(jobs, self.cfg)
 
     # PRINT TEST RESOURCE USAGES
     def print_test_resources(self, test, structures_list):
@@ -152,26 +187,7 @@ class TestReporter:
                 return
 
             structures_list = self.cfg.NODES_LIST
-            misses = dict()
-            for metric in self.cfg.METRICS_TO_CHECK_FOR_MISSING_DATA:
-                metric_name = metric[0]
-                for structure in structures_list:
-                    if metric_name in test["timeseries"][structure]:
-                        timeseries = test["timeseries"][structure][metric_name]
-                    else:
-                        timeseries = None
-                    if bool(timeseries):
-                        structure_misses_list = self.bdwatchdog_handler.perform_check_for_missing_metric_info(
-                            timeseries, self.cfg.MAX_DIFF_TIME)
-                        if not structure_misses_list:
-                            continue
-                    else:
-                        # No timeseries were retrieved, so it is a 100% lost
-                        structure_misses_list = [{"time": 0, "diff_time": test["duration"]}]
-
-                    if metric_name not in misses:
-                        misses[metric_name] = dict()
-                    misses[metric_name][structure] = structure_misses_list
+            misses = test["missing_data"]
 
             if misses:
                 latex_print("\\textbf{TEST:} " + test["test_name"])
@@ -26,12 +26,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 from src.barplotting.utils import get_y_limit
-from src.common.config import Config
 from src.common.utils import translate_metric, save_figure
 
-# Get the config
-cfg = Config()
-
 
 def translate_shares_to_vcore_minutes(bars):
     return [x / (100 * 60) for x in bars]
@@ -124,7 +120,6 @@ def plot_tests_resource_usage(tests):
         plt.close()
 
 
-
 def plot_tests_times(tests):
     labels, durations_seconds, durations_minutes = [], [], []
     width, height = 8, int(len(tests) / 3)
@@ -0,0 +1,151 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from src.common.config import MongoDBConfig, eprint
+from src.ExperimentReporter import ExperimentReporter
+from src.opentsdb import bdwatchdog
+
+# Generates the reports of many experiments in a single process (or pool of processes), which are created once and
+# reused, keeping the modules, configurations and connections warm, the output follows the same layout as
+# 'scripts/generate_report.sh', that is, 'REPORTS/<experiment>/<experiment>.txt' (and '.pdf')
+
+REPORT_GENERATOR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_REPORTS_FOLDER = os.path.join(REPORT_GENERATOR_PATH, "REPORTS")
+LATEX_TEMPLATE = os.path.join(REPORT_GENERATOR_PATH, "latex", "simple_report.template")
+
+# The MongoDB agent is created once per process
+timestamping_agent = None
+
+
+def get_timestamping_agent():
+    global timestamping_agent
+    if timestamping_agent is None:
+        from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
+        timestamping_agent = MongoDBTimestampAgent(MongoDBConfig().get_config_as_dict())
+    return timestamping_agent
+
+
+def read_batch_file(path):
+    # Each line holds an experiment name and the path of its configuration file, relative to the batch file,
+    # empty lines and lines starting with '#' are ignored
+    reports = list()
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) != 2:
+                raise ValueError("Line {0} of '{1}' should be '<experiment> <config file>'".format(line_number, path))
+            reports.append((fields[0], os.path.join(os.path.dirname(os.path.abspath(path)), fields[1])))
+    return reports
+
+
+def generate_pdf(experiment_name):
+    r = subprocess.run(["pandoc", experiment_name + ".txt", "--pdf-engine=xelatex", "--variable=fontsize:8pt",
+                        "--number-sections", "--toc", "--template", LATEX_TEMPLATE, "-o", experiment_name + ".pdf"])
+    for eps_file in glob.glob("*.eps"):
+        os.remove(eps_file)
+    return r.returncode == 0
+
+
+def generate_report(experiment_name, config_path, pdf=False):
+    # Returns the name of the experiment, whether the report was generated and the time taken
+    start = time.time()
+    report_dir = os.path.join(OUTPUT_REPORTS_FOLDER, experiment_name)
+    report_config_path = os.path.join(report_dir, "report_generator_config.ini")
+
+    eprint("Generating report for experiment {0}".format(experiment_name))
+    cwd = os.getcwd()
+    try:
+        os.makedirs(report_dir, exist_ok=True)
+        if not os.path.exists(report_config_path) or not os.path.samefile(config_path, report_config_path):
+            shutil.copyfile(config_path, report_config_path)
+        os.chdir(report_dir)
+        with open(experiment_name + ".txt", "w") as output, contextlib.redirect_stdout(output):
+            agent = get_timestamping_agent()
+            experiment = agent.get_experiment(experiment_name, MongoDBConfig().get_username())
+            if not experiment:
+                eprint("Experiment '{0}' not found".format(experiment_name))
+                return experiment_name, False, time.time() - start
+            ExperimentReporter(experiment_name, agent).report_experiment(experiment)
+        # The counters of the OpenTSDB client of this process, accumulated over the reports it has generated
+        bdw = bdwatchdog.get_client()
+        if bdw.cache:
+            eprint(bdw.cache.get_stats_message())
+        eprint(bdw.get_stats_message())
+        if pdf and generate_pdf(experiment_name):
+            eprint("Successfully generated report")
+        return experiment_name, True, time.time() - start
+    except Exception:
+        eprint("Error generating report for experiment {0}".format(experiment_name))
+        eprint(traceback.format_exc())
+        return experiment_name, False, time.time() - start
+    finally:
+        os.chdir(cwd)
+
+
+def generate_reports(reports, workers=1, pdf=False):
+    # As every report changes the working directory, parallel reports are generated on a pool of processes
+    if workers <= 1:
+        results = [generate_report(experiment_name, config_path, pdf) for experiment_name, config_path in reports]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(generate_report, experiment_name, config_path, pdf)
+                       for experiment_name, config_path in reports]
+            results = [future.result() for future in futures]
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the reports of many experiments in a single process")
+    parser.add_argument("--report", dest="reports", nargs=2, action="append", default=[],
+                        metavar=("EXPERIMENT", "CONFIG"), help="Experiment to generate and its configuration file")
+    parser.add_argument("--batch-file", dest="batch_file", default=None,
+                        help="File with a '<experiment> <config file>' pair per line")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes generating reports at once")
+    parser.add_argument("--pdf", action="store_true", help="Also generate the PDF of every report with pandoc")
+    args = parser.parse_args()
+
+    reports = [(experiment_name, os.path.abspath(config_path)) for experiment_name, config_path in args.reports]
+    if args.batch_file:
+        reports += read_batch_file(args.batch_file)
+    if not reports:
+        parser.error("No reports to generate, use '--report' or '--batch-file'")
+
+    results = generate_reports(reports, args.workers, args.pdf)
+    for experiment_name, success, seconds in results:
+        eprint("{0}: {1} in {2:.1f} seconds".format(experiment_name, "generated" if success else "FAILED", seconds))
+    sys.exit(0 if all(success for _, success, _ in results) else 1)
@@ -0,0 +1,84 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+
+AGGREGATIONS = ["AVG", "SUM", "MAX", "MIN", "DIFF_MAX_MIN", "FIRST", "LAST"]
+
+
+def compute_aggregations(start, end, series_list):
+    # Compute all the aggregations of several timeseries in a single pass, the series are concatenated and
+    # every aggregation is performed as a segmented reduction, returns an array with one row per series
+    # and one column per aggregation in AGGREGATIONS order
+    aggregations = np.zeros((len(series_list), len(AGGREGATIONS)), dtype=np.float64)
+    if not series_list:
+        return aggregations
+
+    lengths = np.fromiter((len(series) for series in series_list), dtype=np.int64, count=len(series_list))
+    if np.any(lengths == 0):
+        raise ValueError("Empty timeseries can not be aggregated")
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ends = starts + lengths - 1
+
+    times = np.concatenate([series.timestamps for series in series_list])
+    values = np.concatenate([series.values for series in series_list])
+
+    # Perform the integration through trapezoidal steps, the step of every point is the area between it and its
+    # previous point, the first point of every series has no previous point so its step is zero
+    steps = np.empty(values.size, dtype=np.float64)
+    steps[0] = 0
+    steps[1:] = (values[1:] + values[:-1]) / 2 * np.diff(times)
+    steps[starts] = 0
+
+    summatory = np.add.reduceat(steps, starts)
+    aggregations[:, 0] = summatory / (end - start)
+    aggregations[:, 1] = summatory
+    aggregations[:, 2] = np.maximum.reduceat(values, starts)
+    aggregations[:, 3] = np.minimum.reduceat(values, starts)
+    aggregations[:, 4] = aggregations[:, 2] - aggregations[:, 3]
+    aggregations[:, 5] = values[starts]
+    aggregations[:, 6] = values[ends]
+    return aggregations
+
+
+def aggregate_timeseries(start, end, keyed_timeseries):
+    # Aggregate a dictionary of timeseries, series without points are not aggregated
+    keys = [key for key in keyed_timeseries if keyed_timeseries[key]]
+    aggregations = compute_aggregations(start, end, [keyed_timeseries[key] for key in keys])
+    results = dict()
+    for key, row in zip(keys, aggregations.tolist()):
+        results[key] = dict(zip(AGGREGATIONS, row))
+    return results
+
+
+def aggregate_structures(start, end, structures_timeseries):
+    # Aggregate the metrics of several structures at once, the result is nested as structure -> metric -> aggregation
+    keyed_timeseries = dict()
+    for structure_name in structures_timeseries:
+        for metric_name, timeseries in structures_timeseries[structure_name].items():
+            keyed_timeseries[(structure_name, metric_name)] = timeseries
+
+    aggregates = dict()
+    for structure_name in structures_timeseries:
+        aggregates[structure_name] = dict()
+    for (structure_name, metric_name), aggregations in aggregate_timeseries(start, end, keyed_timeseries).items():
+        aggregates[structure_name][metric_name] = aggregations
+    return aggregates
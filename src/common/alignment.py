@@ -0,0 +1,80 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+
+from src.common.timeseries import Timeseries
+
+# How the value of a series is obtained at the grid timestamps for which it has no point:
+#  - zero: missing points are 0
+#  - nan: missing points are NaN
+#  - hold: the last known value is held until the next point
+#  - linear: the value is linearly interpolated between the surrounding points
+# With 'hold' and 'linear' the series is only filled inside its own time span, outside it is 0 as the
+# structure was not reporting (e.g., it had not been started yet)
+FILL_POLICIES = ["zero", "nan", "hold", "linear"]
+
+
+def get_time_grid(series_list):
+    # The common grid is the union of the timestamps of all the series, as all the queries use the same downsample
+    # the points of the different series already fall on the same buckets
+    timestamps = [series.timestamps for series in series_list if series]
+    if not timestamps:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(timestamps))
+
+
+def resample_timeseries(series, grid, fill_policy="zero"):
+    if fill_policy == "zero":
+        return series.lookup(grid, fill=0)
+    elif fill_policy == "nan":
+        return series.lookup(grid, fill=np.nan)
+    elif fill_policy not in ["hold", "linear"]:
+        raise ValueError("Unknown fill policy '{0}'".format(fill_policy))
+
+    values = np.zeros(grid.size, dtype=np.float64)
+    if not series:
+        return values
+
+    inside = (grid >= series.timestamps[0]) & (grid <= series.timestamps[-1])
+    if fill_policy == "hold":
+        positions = np.searchsorted(series.timestamps, grid[inside], side="right") - 1
+        values[inside] = series.values[positions]
+    else:
+        values[inside] = np.interp(grid[inside], series.timestamps, series.values)
+    return values
+
+
+def align_timeseries(series_list, grid=None, fill_policy="zero"):
+    # Resample all the series onto a common time grid, returns the grid and a matrix with one row per series
+    if grid is None:
+        grid = get_time_grid(series_list)
+    matrix = np.empty((len(series_list), grid.size), dtype=np.float64)
+    for row, series in enumerate(series_list):
+        matrix[row] = resample_timeseries(series, grid, fill_policy)
+    return grid, matrix
+
+
+def sum_timeseries(series_list, fill_policy="zero"):
+    grid, matrix = align_timeseries(series_list, fill_policy=fill_policy)
+    if not grid.size:
+        return Timeseries()
+    return Timeseries(grid, matrix.sum(axis=0))
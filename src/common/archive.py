@@ -0,0 +1,126 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from src.common.timeseries import Timeseries
+
+# An experiment archive is a zip file with the same layout as the ones written by 'numpy.savez_compressed', every
+# timeseries is stored as a pair of '.npy' arrays and the experiment and tests documents (durations, aggregates...)
+# are stored as JSON in 'metadata.json'. The arrays are written as soon as each test is added, so only the
+# documents are kept in memory until the archive is closed
+ARCHIVE_FORMAT_VERSION = 1
+METADATA_FILE = "metadata.json"
+
+
+def get_archive_path(experiment_name):
+    return "{0}.npz".format(experiment_name)
+
+
+class ArchiveWriter:
+    def __init__(self, path, experiment):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.experiment = experiment
+        self.tests = list()
+        self.num_series = 0
+        self.zip_file = zipfile.ZipFile(self.tmp_path, mode="w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+
+    def __write_array(self, name, array):
+        with self.zip_file.open(name, mode="w", force_zip64=True) as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+
+    def add_test(self, test):
+        # The test document is stored without its timeseries, that are replaced by the index of their arrays
+        test_document = {k: v for k, v in test.items() if k != "timeseries"}
+        series_index = dict()
+        for structure, structure_timeseries in test.get("timeseries", dict()).items():
+            series_index[structure] = dict()
+            for metric, timeseries in structure_timeseries.items():
+                self.__write_array("series/{0}.timestamps.npy".format(self.num_series), timeseries.timestamps)
+                self.__write_array("series/{0}.values.npy".format(self.num_series), timeseries.values)
+                series_index[structure][metric] = self.num_series
+                self.num_series += 1
+        self.tests.append({"test": test_document, "series": series_index})
+
+    def close(self):
+        metadata = {"version": ARCHIVE_FORMAT_VERSION, "experiment": self.experiment, "tests": self.tests}
+        self.zip_file.writestr(METADATA_FILE, json.dumps(metadata, default=str))
+        self.zip_file.close()
+        # The archive only replaces a previous one once it is complete
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.zip_file.close()
+            os.remove(self.tmp_path)
+
+
+class ArchiveReader:
+    def __init__(self, path):
+        self.path = path
+        self.zip_file = zipfile.ZipFile(path, mode="r")
+        metadata = json.loads(self.zip_file.read(METADATA_FILE))
+        if metadata["version"] != ARCHIVE_FORMAT_VERSION:
+            raise ValueError("Unsupported archive version '{0}' in '{1}'".format(metadata["version"], path))
+        self.experiment = metadata["experiment"]
+        self.__tests = metadata["tests"]
+
+    def __read_array(self, name):
+        with self.zip_file.open(name) as f:
+            return np.lib.format.read_array(f, allow_pickle=False)
+
+    def get_num_tests(self):
+        return len(self.__tests)
+
+    def get_test(self, index, with_timeseries=True):
+        test = dict(self.__tests[index]["test"])
+        if with_timeseries:
+            test["timeseries"] = dict()
+            for structure, series_index in self.__tests[index]["series"].items():
+                test["timeseries"][structure] = dict()
+                for metric, n in series_index.items():
+                    test["timeseries"][structure][metric] = Timeseries(
+                        self.__read_array("series/{0}.timestamps.npy".format(n)),
+                        self.__read_array("series/{0}.values.npy".format(n)))
+        return test
+
+    def get_tests(self, with_timeseries=True):
+        for index in range(self.get_num_tests()):
+            yield self.get_test(index, with_timeseries)
+
+    def close(self):
+        self.zip_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
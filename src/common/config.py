@@ -28,6 +28,8 @@ import os
 import sys
 import time
 
+from src.common.derived import parse_derived_metrics
+
 
 class ConfigParams:
     base_path = os.path.dirname(os.path.abspath(__file__))
@@ -66,12 +68,54 @@ class OpenTSDBConfig(DatabaseConfig):
         params.config_keys = [
             "OPENTSDB_IP",
             "OPENTSDB_PORT",
-            "OPENTSDB_SUBDIR"
+            "OPENTSDB_SUBDIR",
+            "OPENTSDB_MAX_IN_FLIGHT",
+            "OPENTSDB_CACHE_ENABLED",
+            "OPENTSDB_CACHE_DIR",
+            "OPENTSDB_CACHE_MAX_SIZE_MB",
+            "OPENTSDB_CACHE_IMMUTABLE_AFTER",
+            "OPENTSDB_QUERY_CHUNK_SECONDS",
+            "OPENTSDB_STREAMING_DECODE",
+            "OPENTSDB_ARRAYS_RESPONSE",
+            "OPENTSDB_POOL_SIZE",
+            "OPENTSDB_CONNECT_TIMEOUT",
+            "OPENTSDB_READ_TIMEOUT",
+            "OPENTSDB_REQUEST_DEADLINE",
+            "OPENTSDB_MAX_TRIES",
+            "OPENTSDB_BACKOFF_BASE",
+            "OPENTSDB_BACKOFF_MAX",
+            "OPENTSDB_BREAKER_THRESHOLD",
+            "OPENTSDB_BREAKER_COOLDOWN",
+            "OPENTSDB_HEDGING",
+            "OPENTSDB_HEDGE_PERCENTILE",
+            "OPENTSDB_HEDGE_MIN_DELAY",
+            "OPENTSDB_HEDGE_BUDGET"
         ]
         params.default_config_values = {
             "OPENTSDB_IP": "opentsdb",
             "OPENTSDB_PORT": 4242,
-            "OPENTSDB_SUBDIR": ""
+            "OPENTSDB_SUBDIR": "",
+            "OPENTSDB_MAX_IN_FLIGHT": 16,
+            "OPENTSDB_CACHE_ENABLED": "false",
+            "OPENTSDB_CACHE_DIR": "~/.cache/ServerlessContainersReportGenerator/opentsdb",
+            "OPENTSDB_CACHE_MAX_SIZE_MB": 1024,
+            "OPENTSDB_CACHE_IMMUTABLE_AFTER": 300,
+            "OPENTSDB_QUERY_CHUNK_SECONDS": 3600,
+            "OPENTSDB_STREAMING_DECODE": "true",
+            "OPENTSDB_ARRAYS_RESPONSE": "true",
+            "OPENTSDB_POOL_SIZE": 16,
+            "OPENTSDB_CONNECT_TIMEOUT": 5,
+            "OPENTSDB_READ_TIMEOUT": 60,
+            "OPENTSDB_REQUEST_DEADLINE": 300,
+            "OPENTSDB_MAX_TRIES": 4,
+            "OPENTSDB_BACKOFF_BASE": 0.5,
+            "OPENTSDB_BACKOFF_MAX": 10,
+            "OPENTSDB_BREAKER_THRESHOLD": 5,
+            "OPENTSDB_BREAKER_COOLDOWN": 30,
+            "OPENTSDB_HEDGING": "false",
+            "OPENTSDB_HEDGE_PERCENTILE": 95,
+            "OPENTSDB_HEDGE_MIN_DELAY": 0.05,
+            "OPENTSDB_HEDGE_BUDGET": 0.1
         }
         DatabaseConfig.__init__(self, params)
 
@@ -84,6 +128,69 @@ class OpenTSDBConfig(DatabaseConfig):
     def getSubdir(self):
         return self.config["OPENTSDB_SUBDIR"]
 
+    def getMaxInFlight(self):
+        return self.config["OPENTSDB_MAX_IN_FLIGHT"]
+
+    def getCacheEnabled(self):
+        return self.config["OPENTSDB_CACHE_ENABLED"]
+
+    def getCacheDir(self):
+        return self.config["OPENTSDB_CACHE_DIR"]
+
+    def getCacheMaxSize(self):
+        return self.config["OPENTSDB_CACHE_MAX_SIZE_MB"]
+
+    def getCacheImmutableAfter(self):
+        return self.config["OPENTSDB_CACHE_IMMUTABLE_AFTER"]
+
+    def getQueryChunkSeconds(self):
+        return self.config["OPENTSDB_QUERY_CHUNK_SECONDS"]
+
+    def getStreamingDecode(self):
+        return self.config["OPENTSDB_STREAMING_DECODE"]
+
+    def getArraysResponse(self):
+        return self.config["OPENTSDB_ARRAYS_RESPONSE"]
+
+    def getPoolSize(self):
+        return self.config["OPENTSDB_POOL_SIZE"]
+
+    def getConnectTimeout(self):
+        return self.config["OPENTSDB_CONNECT_TIMEOUT"]
+
+    def getReadTimeout(self):
+        return self.config["OPENTSDB_READ_TIMEOUT"]
+
+    def getRequestDeadline(self):
+        return self.config["OPENTSDB_REQUEST_DEADLINE"]
+
+    def getMaxTries(self):
+        return self.config["OPENTSDB_MAX_TRIES"]
+
+    def getBackoffBase(self):
+        return self.config["OPENTSDB_BACKOFF_BASE"]
+
+    def getBackoffMax(self):
+        return self.config["OPENTSDB_BACKOFF_MAX"]
+
+    def getBreakerThreshold(self):
+        return self.config["OPENTSDB_BREAKER_THRESHOLD"]
+
+    def getBreakerCooldown(self):
+        return self.config["OPENTSDB_BREAKER_COOLDOWN"]
+
+    def getHedging(self):
+        return self.config["OPENTSDB_HEDGING"]
+
+    def getHedgePercentile(self):
+        return self.config["OPENTSDB_HEDGE_PERCENTILE"]
+
+    def getHedgeMinDelay(self):
+        return self.config["OPENTSDB_HEDGE_MIN_DELAY"]
+
+    def getHedgeBudget(self):
+        return self.config["OPENTSDB_HEDGE_BUDGET"]
+
 
 class MongoDBConfig(DatabaseConfig):
 
@@ -146,7 +253,19 @@ class Config:
         "EXPERIMENT_TYPE",
         "PRINT_ENERGY_MAX",
         "DOWNSAMPLE",
-        "BUCKET"
+        "BUCKET",
+        "TEST_RETRIEVAL_WORKERS",
+        "ALIGNMENT_FILL_POLICY",
+        "DERIVED_METRICS",
+        "PLOTTING_WORKERS",
+        "INCREMENTAL_PLOTS",
+        "STREAMING_REPORT",
+        "EXPERIMENT_ARCHIVE",
+        "DOWNSAMPLE_MODE",
+        "DOWNSAMPLE_POINTS_PER_PIXEL",
+        "LINEPLOT_MAX_POINTS",
+        "AGGREGATES_INDEX",
+        "AGGREGATES_INDEX_PATH"
     ]
     __default_environment_values = {
         "MAX_DIFF_TIME": 10,
@@ -179,7 +298,19 @@ class Config:
         "EXPERIMENT_TYPE": "serverless",
         "PRINT_ENERGY_MAX": "true",
         "DOWNSAMPLE": 5,
-        "BUCKET": "genomics"
+        "BUCKET": "genomics",
+        "TEST_RETRIEVAL_WORKERS": 4,
+        "ALIGNMENT_FILL_POLICY": "zero",
+        "DERIVED_METRICS": "",
+        "PLOTTING_WORKERS": 4,
+        "INCREMENTAL_PLOTS": "true",
+        "STREAMING_REPORT": "false",
+        "EXPERIMENT_ARCHIVE": "false",
+        "DOWNSAMPLE_MODE": "fixed",
+        "DOWNSAMPLE_POINTS_PER_PIXEL": 1,
+        "LINEPLOT_MAX_POINTS": 0,
+        "AGGREGATES_INDEX": "false",
+        "AGGREGATES_INDEX_PATH": ""
     }
 
     def get_numeric_value(self, d, key, numeric_type):
@@ -196,10 +327,13 @@ class Config:
     def get_int_value(self, d, key):
         return self.get_numeric_value(d, key, int)
 
-    def read_config(self, experiment_name):
+    def read_config(self, experiment_name, config_path=None):
         config_dict = {}
         config = configparser.ConfigParser()
-        self.__config_path = "../../REPORTS/{0}/report_generator_config.ini".format(experiment_name)
+        if config_path:
+            self.__config_path = config_path
+        else:
+            self.__config_path = "../../REPORTS/{0}/report_generator_config.ini".format(experiment_name)
         config_file_path = os.path.join(self.__base_path, self.__config_path)
         success = config.read(config_file_path)
         if not success:
@@ -212,9 +346,9 @@ class Config:
                 pass  # Key is not configured, leave it
         return config_dict
 
-    def create_environment(self, experiment_name):
+    def create_environment(self, experiment_name, config_path=None):
         custom_environment = os.environ.copy()
-        config_dict = self.read_config(experiment_name)
+        config_dict = self.read_config(experiment_name, config_path)
         for key in self.__config_keys:
             if key in config_dict.keys():
                 custom_environment[key] = config_dict[key]
@@ -222,14 +356,15 @@ class Config:
                 custom_environment[key] = self.__default_environment_values[key]
         return custom_environment
 
-    def __init__(self, experiment_name):
+    def __init__(self, experiment_name, config_path=None):
+        # The config file is read from 'REPORTS/<experiment_name>' unless another path is given
 
         def strip_quotes(string):
             return string.rstrip('"').lstrip('"')
         def parse_val_list(string):
             return strip_quotes(string).split(",")
 
-        ENV = self.create_environment(experiment_name)
+        ENV = self.create_environment(experiment_name, config_path)
 
         self.EXPERIMENT_TYPE = strip_quotes(ENV["EXPERIMENT_TYPE"])
 
@@ -373,6 +508,9 @@ class Config:
 
         self.SPLIT_LINEPLOTS_WHEN_TIME_GAPS = ENV["SPLIT_LINEPLOTS_WHEN_TIME_GAPS"] == "true"
 
+        # Maximum number of points drawn per line, the lines are decimated (LTTB) above it, 0 disables it
+        self.LINEPLOT_MAX_POINTS = max(0, self.get_int_value(ENV, "LINEPLOT_MAX_POINTS"))
+
         self.FIGURE_SIZE_X = self.get_float_value(ENV, "FIGURE_SIZE_X")
         self.FIGURE_SIZE_Y = self.get_float_value(ENV, "FIGURE_SIZE_Y")
 
@@ -395,6 +533,44 @@ class Config:
 
         self.DOWNSAMPLE = self.get_int_value(ENV, "DOWNSAMPLE")
 
+        # With 'adaptive', the metrics that are only plotted are retrieved with a coarser downsample for long tests,
+        # so that figures get about DOWNSAMPLE_POINTS_PER_PIXEL points per pixel of width, the metrics used in the
+        # tables are always retrieved with DOWNSAMPLE
+        self.DOWNSAMPLE_MODE = strip_quotes(ENV["DOWNSAMPLE_MODE"])
+        if self.DOWNSAMPLE_MODE not in ["fixed", "adaptive"]:
+            default = self.__default_environment_values["DOWNSAMPLE_MODE"]
+            eprint("Invalid configuration for DOWNSAMPLE_MODE, using default value '{0}'".format(default))
+            self.DOWNSAMPLE_MODE = default
+        self.DOWNSAMPLE_POINTS_PER_PIXEL = self.get_float_value(ENV, "DOWNSAMPLE_POINTS_PER_PIXEL")
+
+        # Number of processes used to render the plots, with 1 they are rendered sequentially
+        self.PLOTTING_WORKERS = max(1, self.get_int_value(ENV, "PLOTTING_WORKERS"))
+
+        # Only generate again the plots whose data or configuration changed since they were last generated
+        self.INCREMENTAL_PLOTS = ENV["INCREMENTAL_PLOTS"] == "true"
+
+        # Number of tests whose data is retrieved and aggregated concurrently
+        self.TEST_RETRIEVAL_WORKERS = max(1, self.get_int_value(ENV, "TEST_RETRIEVAL_WORKERS"))
+
+        # Process the tests one by one (within the retrieval workers window), plotting them and dropping their
+        # timeseries as soon as they are retrieved, so that memory usage does not depend on the number of tests
+        self.STREAMING_REPORT = ENV["STREAMING_REPORT"] == "true"
+
+        # Store the timeseries and aggregates of the experiment in an archive the report can be generated again from
+        self.EXPERIMENT_ARCHIVE = ENV["EXPERIMENT_ARCHIVE"] == "true"
+
+        # Store the aggregates and durations of the tests in an index shared by all the experiments (by default,
+        # 'REPORTS/aggregates.sqlite'), so that they can be compared later on
+        self.AGGREGATES_INDEX = ENV["AGGREGATES_INDEX"] == "true"
+        self.AGGREGATES_INDEX_PATH = strip_quotes(ENV["AGGREGATES_INDEX_PATH"])
+
+        # How the timeseries of several structures are filled when they are aligned to be added (e.g., for 'ALL')
+        self.ALIGNMENT_FILL_POLICY = strip_quotes(ENV["ALIGNMENT_FILL_POLICY"])
+        if self.ALIGNMENT_FILL_POLICY not in ["zero", "nan", "hold", "linear"]:
+            default = self.__default_environment_values["ALIGNMENT_FILL_POLICY"]
+            eprint("Invalid configuration for ALIGNMENT_FILL_POLICY, using default value '{0}'".format(default))
+            self.ALIGNMENT_FILL_POLICY = default
+
         self.RESOURCE_UTILIZATION_TUPLES = list()
         if "cpu" in self.REPORTED_RESOURCES:
             self.RESOURCE_UTILIZATION_TUPLES.append(("cpu", "structure.cpu.current", "structure.cpu.used"))
@@ -405,13 +581,24 @@ class Config:
         if "energy" in self.REPORTED_RESOURCES:
             self.RESOURCE_UTILIZATION_TUPLES.append(("energy", "structure.energy.max", "structure.energy.used"))
 
-        self.USAGE_METRICS_SOURCE = list()
+        # Metrics computed from the retrieved ones, as (name, expression) pairs evaluated in order
+        self.DERIVED_METRICS = list()
         if "cpu" in self.REPORTED_RESOURCES:
-            self.USAGE_METRICS_SOURCE.append(("structure.cpu.used", ['proc.cpu.user', 'proc.cpu.kernel']))
+            self.DERIVED_METRICS.append(("structure.cpu.used", "proc.cpu.user + proc.cpu.kernel"))
         if "mem" in self.REPORTED_RESOURCES:
-            self.USAGE_METRICS_SOURCE.append(("structure.mem.used", ['proc.mem.resident']))
+            self.DERIVED_METRICS.append(("structure.mem.used", "proc.mem.resident"))
         if "energy" in self.REPORTED_RESOURCES:
-            self.USAGE_METRICS_SOURCE.append(("structure.energy.used", ['sys.cpu.energy']))
+            self.DERIVED_METRICS.append(("structure.energy.used", "sys.cpu.energy"))
+
+        # Custom derived metrics, e.g., "structure.cpu.utilization = 100 * structure.cpu.used / structure.cpu.current"
+        # separated by ';', they replace the default ones with the same name
+        try:
+            for name, expression in parse_derived_metrics(strip_quotes(ENV["DERIVED_METRICS"])):
+                self.DERIVED_METRICS = [m for m in self.DERIVED_METRICS if m[0] != name]
+                self.DERIVED_METRICS.append((name, expression))
+        except ValueError as e:
+            eprint("Invalid configuration for DERIVED_METRICS, only the default derived metrics will be used: "
+                   "{0}".format(str(e)))
 
         self.METRICS_TO_CHECK_FOR_MISSING_DATA = list()
         if "cpu" in self.REPORTED_RESOURCES:
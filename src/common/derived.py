@@ -0,0 +1,145 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import ast
+import functools
+
+import numpy as np
+
+from src.common.alignment import align_timeseries
+from src.common.timeseries import Timeseries
+
+OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+UNARY_OPERATORS = {ast.USub: np.negative, ast.UAdd: np.positive}
+FUNCTIONS = {"clamp": (3, np.clip), "min": (2, np.minimum), "max": (2, np.maximum), "abs": (1, np.abs)}
+
+
+class DerivedMetric:
+    # A metric computed from other metrics of the same structure through an arithmetic expression, e.g.,
+    # 'structure.cpu.used = proc.cpu.user + proc.cpu.kernel'. Metrics are referenced by their dotted names (or quoted
+    # if they are not valid identifiers), and the expression may use numbers, +, -, *, / and the functions
+    # clamp(x, lower, upper), min(x, y), max(x, y) and abs(x). The expression is compiled once into a function
+    # that is evaluated over the aligned arrays of the referenced metrics.
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+        self.metrics = list()
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError("Invalid expression '{0}' for derived metric '{1}': {2}".format(expression, name, e.msg))
+        self.function = self.__compile(tree.body)
+
+    def __get_metric_name(self, node):
+        if isinstance(node, ast.Name):
+            return node.id
+        elif isinstance(node, ast.Attribute):
+            return "{0}.{1}".format(self.__get_metric_name(node.value), node.attr)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        else:
+            raise ValueError("Invalid metric reference in derived metric '{0}'".format(self.name))
+
+    def __compile(self, node):
+        if isinstance(node, (ast.Name, ast.Attribute)) or (isinstance(node, ast.Constant) and
+                                                           isinstance(node.value, str)):
+            metric_name = self.__get_metric_name(node)
+            if metric_name not in self.metrics:
+                self.metrics.append(metric_name)
+            return lambda env: env[metric_name]
+
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            value = float(node.value)
+            return lambda env: value
+
+        elif isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            operator = OPERATORS[type(node.op)]
+            left, right = self.__compile(node.left), self.__compile(node.right)
+            return lambda env: operator(left(env), right(env))
+
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            operator = UNARY_OPERATORS[type(node.op)]
+            operand = self.__compile(node.operand)
+            return lambda env: operator(operand(env))
+
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+            num_args, function = FUNCTIONS[node.func.id]
+            if len(node.args) != num_args or node.keywords:
+                raise ValueError("Function '{0}' takes {1} arguments in derived metric '{2}'".format(
+                    node.func.id, num_args, self.name))
+            args = [self.__compile(arg) for arg in node.args]
+            return lambda env: function(*[arg(env) for arg in args])
+
+        else:
+            raise ValueError("Unsupported element '{0}' in expression '{1}' for derived metric '{2}'".format(
+                ast.dump(node), self.expression, self.name))
+
+    def can_be_applied(self, structure_timeseries):
+        # Retrieved metrics are never overwritten, and all the referenced metrics must have been retrieved
+        # (or derived) for the structure, even if they have no points
+        if self.name in structure_timeseries:
+            return False
+        return all(metric in structure_timeseries for metric in self.metrics)
+
+    def evaluate(self, structure_timeseries, fill_policy="zero"):
+        series = [structure_timeseries[metric] for metric in self.metrics]
+        grid, matrix = align_timeseries(series, fill_policy=fill_policy)
+        if not grid.size:
+            return Timeseries()
+
+        env = dict(zip(self.metrics, matrix))
+        with np.errstate(all="ignore"):
+            values = np.broadcast_to(np.asarray(self.function(env), dtype=np.float64), grid.shape)
+
+        # Points for which the expression is undefined (e.g., a division by zero) are discarded
+        finite = np.isfinite(values)
+        return Timeseries(grid[finite], values[finite])
+
+
+@functools.lru_cache(maxsize=None)
+def get_derived_metric(name, expression):
+    return DerivedMetric(name, expression)
+
+
+def parse_derived_metrics(declarations):
+    # Parse a list of 'name = expression' declarations separated by ';'
+    derived_metrics = list()
+    for declaration in declarations.split(";"):
+        if not declaration.strip():
+            continue
+        if "=" not in declaration:
+            raise ValueError("Invalid derived metric declaration '{0}'".format(declaration.strip()))
+        name, expression = [part.strip() for part in declaration.split("=", 1)]
+        get_derived_metric(name, expression)
+        derived_metrics.append((name, expression))
+    return derived_metrics
+
+
+def apply_derived_metrics(structure_timeseries, derived_metrics, fill_policy="zero"):
+    # Add the derived metrics to the timeseries of a structure, in declaration order so that a derived metric can
+    # use the previous ones, returns the names of the metrics added
+    applied = list()
+    for name, expression in derived_metrics:
+        derived_metric = get_derived_metric(name, expression)
+        if derived_metric.can_be_applied(structure_timeseries):
+            structure_timeseries[name] = derived_metric.evaluate(structure_timeseries, fill_policy)
+            applied.append(name)
+    return applied
@@ -0,0 +1,167 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numbers
+import os
+import sqlite3
+import time
+
+# Index of the aggregates of the tests of all the experiments, a SQLite database with a row per experiment, per test
+# (with its duration) and per aggregate, that is, per (experiment, test, structure, metric, aggregation), so that
+# experiments can be compared without generating their reports again nor querying OpenTSDB
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "REPORTS",
+                                  "aggregates.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    experiment_id TEXT PRIMARY KEY,
+    username TEXT,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    experiment_id TEXT,
+    test_name TEXT,
+    position INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration REAL,
+    PRIMARY KEY (experiment_id, test_name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aggregates (
+    experiment_id TEXT,
+    test_name TEXT,
+    structure TEXT,
+    metric TEXT,
+    aggregation TEXT,
+    value REAL,
+    PRIMARY KEY (experiment_id, test_name, structure, metric, aggregation)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS aggregates_by_metric ON aggregates (metric, aggregation, structure);
+"""
+
+
+def get_number(value):
+    # Aggregates and durations may be missing (e.g., 'n/a'), those are not indexed
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+class AggregatesIndex:
+    def __init__(self, path=None):
+        self.path = os.path.abspath(path) if path else os.path.abspath(DEFAULT_INDEX_PATH)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Several reports may be generated (and indexed) at once, e.g., by the batch runner
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_experiment(self, experiment, tests):
+        # Index the experiment and its tests, replacing what was indexed for it before
+        experiment_id = experiment["experiment_id"]
+        tests_rows, aggregates_rows = list(), list()
+        for position, test in enumerate(tests):
+            test_name = test["test_name"]
+            tests_rows.append((experiment_id, test_name, position, test.get("start_time"), test.get("end_time"),
+                               get_number(test.get("duration"))))
+            aggregates = test.get("aggregates")
+            if not isinstance(aggregates, dict):
+                continue
+            for structure, structure_aggregates in aggregates.items():
+                for metric, metric_aggregates in structure_aggregates.items():
+                    for aggregation, value in metric_aggregates.items():
+                        value = get_number(value)
+                        if value is not None:
+                            aggregates_rows.append((experiment_id, test_name, structure, metric, aggregation, value))
+
+        with self.connection:
+            for table in ["experiments", "tests", "aggregates"]:
+                self.connection.execute("DELETE FROM {0} WHERE experiment_id = ?".format(table), (experiment_id,))
+            self.connection.execute("INSERT INTO experiments VALUES (?, ?, ?, ?, ?, ?)",
+                                    (experiment_id, experiment.get("username"), experiment.get("start_time"),
+                                     experiment.get("end_time"), get_number(experiment.get("duration")),
+                                     time.time()))
+            self.connection.executemany("INSERT OR REPLACE INTO tests VALUES (?, ?, ?, ?, ?, ?)", tests_rows)
+            self.connection.executemany("INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?)",
+                                        aggregates_rows)
+        return len(aggregates_rows)
+
+    def get_experiments(self, patterns=("*",)):
+        # Experiments whose name matches any of the (glob) patterns, with their number of tests
+        return self.connection.execute(
+            "SELECT e.experiment_id, e.username, e.start_time, e.end_time, e.duration, "
+            "(SELECT COUNT(*) FROM tests t WHERE t.experiment_id = e.experiment_id) "
+            "FROM experiments e WHERE {0} ORDER BY e.experiment_id".format(self.__match_experiments(patterns)),
+            tuple(patterns)).fetchall()
+
+    def get_metrics(self, patterns=("*",)):
+        # Structures, metrics and aggregations indexed for the experiments that match the patterns
+        return self.connection.execute(
+            "SELECT DISTINCT structure, metric, aggregation FROM aggregates WHERE {0} "
+            "ORDER BY structure, metric, aggregation".format(self.__match_experiments(patterns)),
+            tuple(patterns)).fetchall()
+
+    def compare(self, patterns, metric, aggregation="SUM", structure="ALL"):
+        # Comparison table of a metric (or 'duration') across experiments, returns the names of the tests and a row
+        # per experiment with its value for every test (None if missing) and their mean
+        if metric == "duration":
+            query = "SELECT experiment_id, test_name, duration FROM tests WHERE {0}"
+            parameters = tuple(patterns)
+        else:
+            query = "SELECT experiment_id, test_name, value FROM aggregates WHERE {0} " \
+                    "AND metric = ? AND aggregation = ? AND structure = ?"
+            parameters = tuple(patterns) + (metric, aggregation, structure)
+        values = dict()
+        for experiment_id, test_name, value in self.connection.execute(
+                query.format(self.__match_experiments(patterns)), parameters):
+            values.setdefault(experiment_id, dict())[test_name] = value
+
+        # The tests are sorted by their position in the experiments
+        test_names = [test_name for test_name, in self.connection.execute(
+            "SELECT test_name FROM tests WHERE {0} GROUP BY test_name ORDER BY MIN(position), test_name".format(
+                self.__match_experiments(patterns)), tuple(patterns))]
+        rows = list()
+        for experiment_id in sorted(values):
+            row = [values[experiment_id].get(test_name) for test_name in test_names]
+            present = [value for value in row if value is not None]
+            rows.append((experiment_id, row, sum(present) / len(present) if present else None))
+        return test_names, rows
+
+    @staticmethod
+    def __match_experiments(patterns):
+        return "(" + " OR ".join(["experiment_id GLOB ?"] * len(patterns)) + ")"
+
+
+def index_experiment(experiment, tests, path=None):
+    with AggregatesIndex(path) as index:
+        return index.add_experiment(experiment, tests)
@@ -0,0 +1,81 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.common.config import eprint
+
+
+def get_digest(*parts):
+    # Content hash of the inputs of a figure, arrays are hashed by their raw contents and anything else by its JSON
+    # representation
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str((part.dtype.str, part.shape)).encode("utf-8"))
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class PlotManifest:
+    # Record of the digest of the inputs of every figure stored in a directory, a figure whose inputs have the same
+    # digest as when it was last generated, and whose files still exist, does not need to be generated again
+    FILE_NAME = ".plots_manifest.json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.entries = dict()
+        self.modified = False
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            eprint("Plots manifest '{0}' could not be read, all its figures will be generated".format(self.path))
+
+    def is_up_to_date(self, figure_name, digest, file_paths):
+        entry = self.entries.get(figure_name)
+        if not entry or entry["digest"] != digest or sorted(entry["files"]) != sorted(file_paths):
+            return False
+        return all(os.path.exists(file_path) for file_path in file_paths)
+
+    def record(self, figure_name, digest, file_paths):
+        self.entries[figure_name] = {"digest": digest, "files": list(file_paths)}
+        self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.modified = False
@@ -0,0 +1,91 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+
+
+class Timeseries:
+    # Columnar timeseries, the points are kept sorted by timestamp in two arrays, the int64 timestamps (seconds)
+    # and their float64 values
+    __slots__ = ("timestamps", "values")
+
+    def __init__(self, timestamps=None, values=None):
+        if timestamps is None:
+            timestamps, values = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @staticmethod
+    def from_dps(dps):
+        # Build the timeseries from the 'dps' field of an OpenTSDB response, either a dictionary keyed by string
+        # timestamps or, in the 'arrays' form, a list of [timestamp, value] pairs
+        if isinstance(dps, list):
+            points = np.array(dps, dtype=np.float64).reshape(-1, 2)
+            timestamps, values = points[:, 0].astype(np.int64), points[:, 1].copy()
+        else:
+            timestamps = np.fromiter(map(int, dps.keys()), dtype=np.int64, count=len(dps))
+            values = np.fromiter(dps.values(), dtype=np.float64, count=len(dps))
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+        return Timeseries(timestamps, values)
+
+    @staticmethod
+    def concatenate(series_list):
+        # Join consecutive pieces of a timeseries (e.g., retrieved in time chunks), if a timestamp appears more than
+        # once only its last point is kept
+        series_list = [series for series in series_list if series]
+        if not series_list:
+            return Timeseries()
+        if len(series_list) == 1:
+            return series_list[0]
+        timestamps = np.concatenate([series.timestamps for series in series_list])
+        values = np.concatenate([series.values for series in series_list])
+        if np.any(timestamps[1:] <= timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+            last = np.append(timestamps[1:] != timestamps[:-1], True)
+            timestamps, values = timestamps[last], values[last]
+        return Timeseries(timestamps, values)
+
+    def to_dps(self):
+        return {str(t): v for t, v in zip(self.timestamps.tolist(), self.values.tolist())}
+
+    def lookup(self, timestamps, fill=np.nan):
+        # Values of the series at the given timestamps, 'fill' is used for the timestamps with no point
+        result = np.full(len(timestamps), fill, dtype=np.float64)
+        if self.timestamps.size:
+            positions = np.minimum(np.searchsorted(self.timestamps, timestamps), self.timestamps.size - 1)
+            found = self.timestamps[positions] == timestamps
+            result[found] = self.values[positions[found]]
+        return result
+
+    def copy(self):
+        return Timeseries(self.timestamps.copy(), self.values.copy())
+
+    def __len__(self):
+        return self.timestamps.size
+
+    def __bool__(self):
+        return self.timestamps.size > 0
+
+    def __repr__(self):
+        return "Timeseries({0} points)".format(len(self))
@@ -0,0 +1,111 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Spans of the report generation phases, recorded as Chrome trace events ('X' complete events) that can be opened
+# with chrome://tracing or Perfetto. Tracing is disabled by default and spans are then a no-op. The arguments of a
+# span (e.g., the test or the structure) are inherited by the spans nested in it, also across threads when the
+# context is copied (see 'wrap_context')
+enabled = False
+events = list()
+events_lock = threading.Lock()
+traced_threads = set()
+span_args = contextvars.ContextVar("span_args", default=dict())
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def is_enabled():
+    return enabled
+
+
+def name_process(name):
+    if enabled:
+        with events_lock:
+            events.append(dict(name="process_name", ph="M", pid=os.getpid(), args=dict(name=name)))
+
+
+@contextmanager
+def span(name, category="report", **args):
+    if not enabled:
+        yield
+        return
+
+    args = dict(span_args.get(), **args)
+    token = span_args.set(args)
+    start = time.time()
+    try:
+        yield
+    finally:
+        end = time.time()
+        span_args.reset(token)
+        record_event(dict(name=name, cat=category, ph="X", ts=start * 1e6, dur=(end - start) * 1e6, args=args))
+
+
+def record_event(event):
+    pid, tid = os.getpid(), threading.get_native_id()
+    event.update(pid=pid, tid=tid)
+    with events_lock:
+        if (pid, tid) not in traced_threads:
+            # Name the thread in the trace the first time it records an event
+            traced_threads.add((pid, tid))
+            events.append(dict(name="thread_name", ph="M", pid=pid, tid=tid,
+                               args=dict(name=threading.current_thread().name)))
+        events.append(event)
+
+
+def wrap_context(function, *args):
+    # Run the function with the current context (e.g., in an executor thread), so that its spans are nested
+    context = contextvars.copy_context()
+    return lambda: context.run(function, *args)
+
+
+def pop_events():
+    # Take the events recorded so far (e.g., by a worker process to return them to the main one)
+    global events
+    with events_lock:
+        popped, events = events, list()
+        traced_threads.clear()
+    return popped
+
+
+def add_events(new_events):
+    with events_lock:
+        events.extend(new_events)
+
+
+def write_trace(path):
+    with events_lock:
+        trace = dict(traceEvents=list(events), displayTimeUnit="ms")
+    with open(path, "w") as f:
+        json.dump(trace, f)
@@ -23,14 +23,34 @@
 
 from __future__ import print_function
 
+import math
 import pathlib
+import threading
 import time
 
-from src.opentsdb import bdwatchdog
+from src.common.aggregation import aggregate_structures
+from src.common.alignment import sum_timeseries
+from src.common.derived import apply_derived_metrics, get_derived_metric
 from src.common.config import OpenTSDBConfig, eprint
+from src.common.tracing import span
 
-# initialize the OpenTSDB handler
-bdw = bdwatchdog.BDWatchdog(OpenTSDBConfig())
+# The OpenTSDB handler is created (and its modules imported) the first time it is needed
+async_client = None
+async_client_lock = threading.Lock()
+
+# Resolution the figures are saved with
+FIGURE_DPI = 450
+
+
+def get_async_client():
+    # Tests are retrieved from several threads, a single handler keeps the limit of requests in flight process-wide
+    global async_client
+    with async_client_lock:
+        if async_client is None:
+            from src.opentsdb import bdwatchdog, async_bdwatchdog
+            opentsdb_config = OpenTSDBConfig()
+            async_client = async_bdwatchdog.AsyncBDWatchdog(opentsdb_config, bdwatchdog.get_client(opentsdb_config))
+        return async_client
 
 
 def get_plots_metrics():
@@ -131,6 +151,41 @@ def get_plots_metrics():
 
 
 # Generate the resource information
+def get_plot_downsample(cfg, start, end):
+    # Coarsest downsample that still gives the figures DOWNSAMPLE_POINTS_PER_PIXEL points per pixel of width, as a
+    # multiple of DOWNSAMPLE so that the series remain aligned with the full resolution ones
+    if cfg.DOWNSAMPLE_MODE != "adaptive":
+        return cfg.DOWNSAMPLE
+    points_budget = max(1, int(cfg.FIGURE_SIZE_X * FIGURE_DPI * cfg.DOWNSAMPLE_POINTS_PER_PIXEL))
+    return max(1, math.ceil((end - start) / (points_budget * cfg.DOWNSAMPLE))) * cfg.DOWNSAMPLE
+
+
+def get_full_resolution_metrics(cfg):
+    # Metrics that are used for the tables and thus always retrieved with DOWNSAMPLE
+    metrics = set()
+    for _, current, usage in cfg.RESOURCE_UTILIZATION_TUPLES:
+        metrics.update([current, usage])
+    if cfg.PRINT_TEST_BASIC_INFORMATION:
+        metrics.update(cfg.PRINTED_METRICS)
+    if cfg.PRINT_MISSING_INFO_REPORT:
+        metrics.update(metric[0] for metric in cfg.METRICS_TO_CHECK_FOR_MISSING_DATA)
+    for name, expression in cfg.DERIVED_METRICS:
+        metrics.update(get_derived_metric(name, expression).metrics)
+    return metrics
+
+
+def get_metrics_downsamples(cfg, metrics, start, end):
+    # Split the metrics into the groups that are retrieved with the same downsample
+    plot_downsample = get_plot_downsample(cfg, start, end)
+    if plot_downsample == cfg.DOWNSAMPLE:
+        groups = [(metrics, cfg.DOWNSAMPLE)]
+    else:
+        full_resolution_metrics = get_full_resolution_metrics(cfg)
+        groups = [([m for m in metrics if m[0] in full_resolution_metrics], cfg.DOWNSAMPLE),
+                  ([m for m in metrics if m[0] not in full_resolution_metrics], plot_downsample)]
+    return [(metrics_group, downsample) for metrics_group, downsample in groups if metrics_group]
+
+
 def generate_resources_timeseries(document, cfg):
     #  Check that the needed start and end time are present, otherwise abort
     if "end_time" not in document or "start_time" not in document:
@@ -140,88 +195,103 @@ def generate_resources_timeseries(document, cfg):
 
     start, end = document["start_time"], document["end_time"]
 
-    # Retrieve the timeseries from OpenTSDB and perform the per-structure aggregations
-    # Slow loop due to network call
+    # Retrieve the timeseries from OpenTSDB, each class of structures is retrieved with a single query (or one per
+    # downsample if it is adaptive) and all the queries are issued concurrently
+    structure_classes = [(cfg.NODES_LIST, cfg.BDWATCHDOG_NODE_METRICS),
+                         (cfg.APPS_LIST, cfg.BDWATCHDOG_APP_METRICS),
+                         (cfg.USERS_LIST, cfg.BDWATCHDOG_USER_METRICS)]
+    async_bdw = get_async_client()
+    queries, query_classes = list(), list()
+    for index, (structure_names, metrics) in enumerate(structure_classes):
+        for metrics_group, downsample in get_metrics_downsamples(cfg, metrics, start, end):
+            queries.append(async_bdw.get_structures_timeseries(structure_names, start, end, metrics_group,
+                                                               downsample=downsample))
+            query_classes.append(index)
+
+    # Fix for buckets, the bucket is the same for all the users so it is only retrieved once
+    if "tasks" in cfg.REPORTED_RESOURCES:
+        bucket_metrics = [m for m in cfg.BDWATCHDOG_USER_METRICS if m[0].startswith("bucket.")]
+        for metrics_group, downsample in get_metrics_downsamples(cfg, bucket_metrics, start, end):
+            queries.append(async_bdw.get_timeseries(cfg.BUCKET, start, end, metrics_group, downsample=downsample))
+            query_classes.append(len(structure_classes))
+    ############
+
+    with span("retrieve_timeseries", category="opentsdb"):
+        results = async_bdw.run(queries)
+
+    # Merge the results of the queries of every class of structures
+    classes_ts = [{name: dict() for name in structure_names} for structure_names, _ in structure_classes]
+    bucket_ts = dict()
+    for index, result in zip(query_classes, results):
+        if index == len(structure_classes):
+            bucket_ts.update(result)
+        else:
+            for structure_name, structure_ts in result.items():
+                classes_ts[index][structure_name].update(structure_ts)
+    nodes_ts, apps_ts, users_ts = classes_ts
+
+    # Perform the per-structure aggregations
     document["timeseries"] = dict()
     doc_timeseries = document["timeseries"]
     for node_name in cfg.NODES_LIST:
-        ts = bdw.get_timeseries(node_name, start, end, cfg.BDWATCHDOG_NODE_METRICS, downsample=cfg.DOWNSAMPLE)
+        ts = nodes_ts[node_name]
         if not ts:
             eprint("Could not retrieve any timeseries for node {0}".format(node_name))
         else:
             eprint("Retrieved ts {0} for node {1}".format(ts.keys(), node_name))
             doc_timeseries[node_name] = ts
 
-    # Generate the aggregations of the retrieved resource metrics
-    document["aggregates"] = dict()
-    doc_aggregates = document["aggregates"]
-    for node_name in cfg.NODES_LIST:
-        node_metrics = doc_timeseries[node_name]
-        doc_aggregates[node_name] = bdw.aggregate_metrics(start, end, node_metrics)
-
-    # Generate the per-node 'usage' time series (e.g., structure.cpu.used)
-    for node_name in cfg.NODES_LIST:
-        node_metrics = doc_timeseries[node_name]
-        for (usage_metric, source_metrics) in cfg.USAGE_METRICS_SOURCE:
-            # Initialize
-            if usage_metric not in node_metrics:
-                node_metrics[usage_metric] = dict()
-
-            # Get the first metric as the time reference, considering that all metrics should have
-            # the same timestamps (they should be time-aligned)
-            first_metric = node_metrics[source_metrics[0]]
-            for time_point in first_metric:
+    for app in cfg.APPS_LIST:
+        ts = apps_ts[app]
+        if ts:
+            eprint("Retrieved ts {0} for app {1}".format(ts.keys(), app))
+        doc_timeseries[app] = ts
 
-                # Initialize
-                node_metrics[usage_metric][time_point] = 0
-
-                # Iterate through the metrics
-                for metric in source_metrics:
-                    # Timestamp from the first 'reference' metric is not present in other metric,
-                    # this may be due to the head and tail data points of the time series
-                    if time_point not in node_metrics[metric]:
-                        continue
-                    # Sum
-                    node_metrics[usage_metric][time_point] += node_metrics[metric][time_point]
-
-    # Generate the per-node 'usage' aggregations
-    for node_name in cfg.NODES_LIST:
-        for (usage_metric, metrics_to_aggregate) in cfg.USAGE_METRICS_SOURCE:
-            aggregates = doc_aggregates[node_name]
+    for user in cfg.USERS_LIST:
+        ts = users_ts[user]
+        if ts:
+            eprint("Retrieved ts {0} for user {1}".format(ts.keys(), user))
+        doc_timeseries[user] = ts
 
-            # Initialize
-            if usage_metric not in aggregates:
-                aggregates[usage_metric] = {"SUM": 0, "AVG": 0}
+        # Fix for buckets
+        for k, v in bucket_ts.items():
+            doc_timeseries[user][k] = v.copy()
+        ############
 
-            # Add up to create the SUM
-            sum = 0
-            for metric in metrics_to_aggregate:
-                if metric in aggregates:
-                    sum += aggregates[metric]["SUM"]
-            aggregates[usage_metric]["SUM"] = sum
+    # Generate the per-structure derived time series (e.g., structure.cpu.used)
+    structures = [name for name in cfg.NODES_LIST + cfg.APPS_LIST + cfg.USERS_LIST if name in doc_timeseries]
+    derived_metrics = dict()
+    for structure_name in structures:
+        with span("derived_metrics", structure=structure_name):
+            derived_metrics[structure_name] = apply_derived_metrics(doc_timeseries[structure_name],
+                                                                    cfg.DERIVED_METRICS, cfg.ALIGNMENT_FILL_POLICY)
+
+    # Generate the aggregations of the retrieved and derived metrics for all the structures in a single pass
+    with span("aggregation", structures=len(structures)):
+        structures_aggregates = aggregate_structures(start, end, {name: doc_timeseries[name] for name in structures})
+
+    # Generate the per-structure derived metrics aggregations, if derived metrics had no points to be aggregated
+    # they are considered to be zero
+    for structure_name in structures:
+        for metric in derived_metrics[structure_name]:
+            if metric not in structures_aggregates[structure_name]:
+                structures_aggregates[structure_name][metric] = {"SUM": 0, "AVG": 0}
 
-            # Create the AVG from the SUM
-            aggregates[usage_metric]["AVG"] = sum / document["duration"]
+    document["aggregates"] = dict()
+    doc_aggregates = document["aggregates"]
+    for node_name in cfg.NODES_LIST:
+        doc_aggregates[node_name] = structures_aggregates[node_name]
 
     # Generate the 'ALL' pseudo-metrics for all the container nodes
+    # The nodes' timeseries are aligned on a common time grid and added up
     doc_timeseries["ALL"] = dict()
-    for node_name in cfg.NODES_LIST:
-        for metric in doc_timeseries[node_name]:
-
-            # If the first node, set the timeseries as base
-            if metric not in doc_timeseries["ALL"]:
-                doc_timeseries["ALL"][metric] = doc_timeseries[node_name][metric]
-            else:
-
-                # For the next nodes, add them up point by point
-                doc_metric = doc_timeseries["ALL"][metric]
-                node_metric = doc_timeseries[node_name][metric]
-
-                for time_point in node_metric:
-                    try:
-                        doc_metric[time_point] += node_metric[time_point]
-                    except KeyError:
-                        pass
+    with span("all_timeseries", structures=len(cfg.NODES_LIST)):
+        for node_name in cfg.NODES_LIST:
+            for metric in doc_timeseries[node_name]:
+                if metric not in doc_timeseries["ALL"]:
+                    nodes_metric = [doc_timeseries[node][metric] for node in cfg.NODES_LIST
+                                    if metric in doc_timeseries[node]]
+                    doc_timeseries["ALL"][metric] = sum_timeseries(nodes_metric, cfg.ALIGNMENT_FILL_POLICY)
 
     # Generate the 'ALL' pseudo-metrics aggregations
     doc_aggregates["ALL"] = dict()
@@ -243,40 +313,18 @@ def generate_resources_timeseries(document, cfg):
                 metric_global_aggregates[aggregation] += node_agg_metric[aggregation]
 
     for app in cfg.APPS_LIST:
-        ts = bdw.get_timeseries(app, start, end, cfg.BDWATCHDOG_APP_METRICS, downsample=cfg.DOWNSAMPLE)
-        if ts:
-            eprint("Retrieved ts {0} for app {1}".format(ts.keys(), app))
-        doc_timeseries[app] = ts
-        doc_aggregates[app] = bdw.aggregate_metrics(start, end, doc_timeseries[app])
+        doc_aggregates[app] = structures_aggregates[app]
 
     for user in cfg.USERS_LIST:
-        ts = bdw.get_timeseries(user, start, end, cfg.BDWATCHDOG_USER_METRICS, downsample=cfg.DOWNSAMPLE)
-        if ts:
-            eprint("Retrieved ts {0} for user {1}".format(ts.keys(), user))
-        doc_timeseries[user] = ts
-
-        # Fix for buckets
-        bucket_ts = [m for m in cfg.BDWATCHDOG_USER_METRICS if m[0].startswith("bucket.")]
-        if "tasks" in cfg.REPORTED_RESOURCES:
-            ts = bdw.get_timeseries(cfg.BUCKET, start, end, bucket_ts, downsample=cfg.DOWNSAMPLE)
-            for k, v in ts.items():
-                doc_timeseries[user][k] = v
-        ############
-
-        doc_aggregates[user] = bdw.aggregate_metrics(start, end, doc_timeseries[user])
+        doc_aggregates[user] = structures_aggregates[user]
 
 
     # This metric is manually added because container structures do not have it, only application structures
     if "energy" in cfg.REPORTED_RESOURCES:
         doc_aggregates["ALL"]["structure.energy.max"] = {"SUM": 0, "AVG": 0}
-        doc_timeseries["ALL"]["structure.energy.max"] = {}
+        apps_energy_max = [doc_timeseries[app]["structure.energy.max"] for app in cfg.APPS_LIST]
+        doc_timeseries["ALL"]["structure.energy.max"] = sum_timeseries(apps_energy_max, cfg.ALIGNMENT_FILL_POLICY)
         for app in cfg.APPS_LIST:
-            for time_point in doc_timeseries[app]["structure.energy.max"]:
-                try:
-                    doc_timeseries["ALL"]["structure.energy.max"][time_point] += doc_timeseries[app]["structure.energy.max"][time_point]
-                except KeyError:
-                    doc_timeseries["ALL"]["structure.energy.max"][time_point] = doc_timeseries[app]["structure.energy.max"][time_point]
-
             doc_aggregates["ALL"]["structure.energy.max"]["SUM"] += doc_aggregates[app]["structure.energy.max"]["SUM"]
             doc_aggregates["ALL"]["structure.energy.max"]["AVG"] += doc_aggregates[app]["structure.energy.max"]["AVG"]
 
@@ -300,7 +348,8 @@ def save_figure(figure_filepath_directory, figure_name, figure, format="svg", pa
     figure_filepath = "{0}/{1}".format(figure_filepath_directory, figure_name)
     create_output_directory(figure_filepath_directory)
     # figure.savefig(figure_filepath, transparent=True, bbox_inches='tight', pad_inches=0, format=format)
-    figure.savefig(figure_filepath, bbox_inches='tight', pad_inches=pad_inches, format=format, dpi=450)
+    with span("save_figure", category="matplotlib", figure=figure_filepath):
+        figure.savefig(figure_filepath, bbox_inches='tight', pad_inches=pad_inches, format=format, dpi=FIGURE_DPI)
 
 
 def format_metric(value, label, aggregation):
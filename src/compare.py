@@ -0,0 +1,121 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import print_function
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from tabulate import tabulate
+
+from src.common.index import AggregatesIndex
+
+# Queries the index of aggregates of the experiments (see 'src/common/index.py'), e.g., to compare the CPU usage of
+# the tests of two groups of experiments:
+#   python3 src/compare.py compare 'genomics_greedy_*' 'genomics_conservative_*' --metric structure.cpu.used
+
+
+def read_report_directory(report_dir):
+    # Rebuild the experiment and its tests from the JSON dumps of the tests of an already generated report
+    tests = list()
+    for json_path in glob.glob(os.path.join(report_dir, "*.json")):
+        with open(json_path) as f:
+            document = json.load(f)
+        if isinstance(document, dict) and "test_name" in document and "experiment_id" in document:
+            tests.append(document)
+    if not tests:
+        return None, tests
+    tests.sort(key=lambda test: (test.get("start_time") or 0, test["test_name"]))
+    start_times = [test["start_time"] for test in tests if "start_time" in test]
+    end_times = [test["end_time"] for test in tests if "end_time" in test]
+    experiment = dict(experiment_id=tests[0]["experiment_id"], username=tests[0].get("username"))
+    if start_times and end_times:
+        experiment.update(start_time=min(start_times), end_time=max(end_times),
+                          duration=max(end_times) - min(start_times))
+    return experiment, tests
+
+
+def add_reports(index, report_dirs):
+    for report_dir in report_dirs:
+        experiment, tests = read_report_directory(report_dir)
+        if experiment is None:
+            print("No tests found in '{0}'".format(report_dir), file=sys.stderr)
+            continue
+        num_aggregates = index.add_experiment(experiment, tests)
+        print("Indexed {0} aggregates of {1} tests of experiment '{2}'".format(
+            num_aggregates, len(tests), experiment["experiment_id"]))
+
+
+def print_comparison(index, args):
+    test_names, rows = index.compare(args.patterns, args.metric, args.aggregation, args.structure)
+    if not rows:
+        print("No values of the {0} of '{1}' for '{2}' found".format(args.aggregation, args.metric, args.structure),
+              file=sys.stderr)
+        return False
+    headers = ["experiment"] + test_names + ["mean"]
+    print(tabulate([[experiment_id] + values + [mean] for experiment_id, values, mean in rows], headers=headers,
+                   tablefmt=args.format, floatfmt=".2f", missingval="n/a"))
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the aggregates of the tests of several experiments")
+    parser.add_argument("--index", dest="index_path", default=None,
+                        help="Path of the index, by default 'REPORTS/aggregates.sqlite'")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    list_parser = subparsers.add_parser("list", help="List the indexed experiments")
+    list_parser.add_argument("patterns", nargs="*", default=["*"], help="Names (or glob patterns) of the experiments")
+
+    metrics_parser = subparsers.add_parser("metrics", help="List the indexed structures, metrics and aggregations")
+    metrics_parser.add_argument("patterns", nargs="*", default=["*"],
+                                help="Names (or glob patterns) of the experiments")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a metric across experiments, test by test")
+    compare_parser.add_argument("patterns", nargs="+", help="Names (or glob patterns) of the experiments")
+    compare_parser.add_argument("--metric", required=True, help="Metric to compare, or 'duration' for the tests "
+                                                                "durations")
+    compare_parser.add_argument("--aggregation", default="SUM", help="e.g., SUM, AVG, MAX")
+    compare_parser.add_argument("--structure", default="ALL", help="Structure (e.g., a node or app) or 'ALL'")
+    compare_parser.add_argument("--format", default="simple", help="Table format, as in tabulate (e.g., 'pipe')")
+
+    add_parser = subparsers.add_parser("add", help="Index already generated reports from their JSON test dumps")
+    add_parser.add_argument("report_dirs", nargs="+", help="Directories of the reports (e.g., 'REPORTS/<name>')")
+    args = parser.parse_args()
+
+    success = True
+    with AggregatesIndex(args.index_path) as index:
+        if args.command == "list":
+            print(tabulate(index.get_experiments(args.patterns),
+                           headers=["experiment", "username", "start_time", "end_time", "duration", "tests"]))
+        elif args.command == "metrics":
+            print(tabulate(index.get_metrics(args.patterns), headers=["structure", "metric", "aggregation"]))
+        elif args.command == "compare":
+            success = print_comparison(index, args)
+        elif args.command == "add":
+            add_reports(index, args.report_dirs)
+    sys.exit(0 if success else 1)
@@ -1,4 +1,4 @@
-from src.common.config import OpenTSDBConfig, MongoDBConfig
+from src.common.config import MongoDBConfig
 from src.opentsdb import bdwatchdog
 from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
 import matplotlib.pyplot as plt
@@ -18,7 +18,7 @@ def get_time_taken(data, value):
     return time_transfered - time_sent
 
 
-bdw = bdwatchdog.BDWatchdog(OpenTSDBConfig())
+bdw = bdwatchdog.get_client()
 mongoDBConfig = MongoDBConfig()
 timestampingAgent = MongoDBTimestampAgent(mongoDBConfig.get_config_as_dict())
 
@@ -29,9 +29,9 @@ start, end = experiment["start_time"], experiment["end_time"]
 timeseries = bdw.get_timeseries("user0", start, end, [('user.accounting.coins', 'user')], downsample=5)["user.accounting.coins"]
 
 # Convert the time stamps to times relative to 0 (basetime)
-basetime = int(list(timeseries.keys())[0])
-x = list(map(lambda point: int(point) - basetime, timeseries))
-y = list(map(lambda point: int(point), timeseries.values()))
+basetime = int(timeseries.timestamps[0])
+x = (timeseries.timestamps - basetime).tolist()
+y = timeseries.values.astype(int).tolist()
 
 data = zip(x, y)
 
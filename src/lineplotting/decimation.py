@@ -0,0 +1,72 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+def lttb(x, y, num_points):
+    # Largest-Triangle-Three-Buckets, keeps the first and last points and, from every bucket in between, the point
+    # that forms the largest triangle with the point kept from the previous bucket and the average of the next one,
+    # which preserves the peaks and the shape of the line
+    size = x.size
+    if num_points >= size or num_points < 3:
+        return x, y
+
+    every = (size - 2) / (num_points - 2)
+    edges = (np.arange(num_points - 1) * every).astype(np.int64) + 1
+    edges[-1] = size - 1
+    indices = np.empty(num_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+
+    a = 0
+    for i in range(num_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < edges.size else size
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return x[indices], y[indices]
+
+
+def decimate_line(x, y, max_points):
+    # Reduce a line to about 'max_points' points, every segment between NaN points (i.e., the gap markers that split
+    # the line) is decimated on its own with a share of the points proportional to its length, and the NaN points
+    # are kept
+    if not max_points or x.size <= max_points:
+        return x, y
+
+    nans = np.flatnonzero(np.isnan(y))
+    bounds = np.concatenate(([-1], nans, [x.size]))
+    num_valid = x.size - nans.size
+    xs, ys = list(), list()
+    for i in range(bounds.size - 1):
+        start, end = bounds[i] + 1, bounds[i + 1]
+        if end > start:
+            num_points = max(3, int(round(max_points * (end - start) / num_valid)))
+            segment_x, segment_y = lttb(x[start:end], y[start:end], num_points)
+            xs.append(segment_x)
+            ys.append(segment_y)
+        if end < x.size:
+            xs.append(x[end:end + 1])
+            ys.append(y[end:end + 1])
+    return np.concatenate(xs), np.concatenate(ys)
@@ -25,17 +25,16 @@ from __future__ import print_function
 import math
 
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
 from matplotlib.ticker import FormatStrFormatter
-from numpy import NaN
 
-from src.opentsdb import bdwatchdog
+from src.lineplotting.decimation import decimate_line
 from src.lineplotting.style import line_style, dashes_dict, line_marker, LEGEND_FONTSIZE
-from src.common.config import OpenTSDBConfig, eprint
+from src.common.config import eprint
+from src.common.manifest import get_digest
 from src.common.utils import translate_metric, save_figure
-
-# initialize the OpenTSDB handler
-bdwatchdog_handler = bdwatchdog.BDWatchdog(OpenTSDBConfig())
+from src.lineplotting.scheduler import render_plots
 
 
 def translate_plot_name_to_ylabel(plot_name):
@@ -53,31 +52,17 @@ def translate_plot_name_to_ylabel(plot_name):
         return plot_name
 
 
-def rebase_ts_values(resource, timeseries):
+def rebase_ts_values(resource, values):
     if resource == "mem":
         # Translate from MiB to GiB
-        return list(map(lambda point: int(point / 1024), timeseries.values()))
+        return np.trunc(values / 1024)
     else:
-        return list(timeseries.values())
-
-
-def plot_test_doc(test, doc_name, plots, cfg):
-    def add_xticks():
-        if cfg.STATIC_LIMITS:
-            ticks = np.arange(0, right, step=cfg.XTICKS_STEP)
-        else:
-            ticks = np.arange(0, int(end_time) - int(start_time), step=cfg.XTICKS_STEP)
-            # May be inaccurate up to +- 'downsample' seconds,
-            # because the data may start a little after the specified 'start' time or end
-            # a little before the specified 'end' time
+        return values
 
-        ROTATION = 0
-        HORIZONTAL_ALIGN = "right"
-        labels = ["{0}".format(t) for t in ticks]
-        plt.xticks(ticks, labels=labels, rotation=ROTATION, ha=HORIZONTAL_ALIGN)
 
-
-    start_time, end_time = test["start_time"], test["end_time"]
+def get_plot_jobs(test, doc_name, plots, cfg):
+    # Every (test, doc, resource) plot is an independent job that only carries the timeseries it needs
+    jobs = list()
     test_name = test["test_name"]
     doc_ts = test["timeseries"][doc_name]
     for resource in plots:
@@ -96,215 +81,312 @@ def plot_test_doc(test, doc_name, plots, cfg):
             eprint("In test '{0}' plot '{1}' for doc '{2}' has no data, skipping".format(test_name, resource, doc_name))
             continue
 
-        # Values used for setting the X and Y limits, without depending on actual time series values ####
-        if cfg.STATIC_LIMITS:
-            if doc_name not in cfg.XLIM:
-                max_x_ts_point_value = cfg.XLIM["default"]
-            else:
-                max_x_ts_point_value = cfg.XLIM[doc_name]
-            if doc_name not in cfg.YLIM or resource not in cfg.YLIM[doc_name]:
-                max_y_ts_point_value = cfg.YLIM["default"][resource]
-                min_y_ts_point_value = cfg.YMIN["default"][resource]
-            else:
-                max_y_ts_point_value = cfg.YLIM[doc_name][resource]
-                min_y_ts_point_value = cfg.YMIN[doc_name][resource]
-        else:
-            max_y_ts_point_value, max_x_ts_point_value = 0, 0
-            min_y_ts_point_value = 0
+        timeseries = dict()
+        for metric in plots[resource]:
+            metric_name = metric[0]
+            if metric_name in doc_ts and doc_ts[metric_name]:
+                timeseries[metric_name] = doc_ts[metric_name]
 
-        size_y = cfg.FIGURE_SIZE_Y
-        if cfg.SINGLE_PLOT_WITH_XLABEL:
-            if resource == cfg.SINGLE_PLOT_WITH_XLABEL:
-                size_y *= 1.1
+        jobs.append(dict(test_name=test_name, start_time=test["start_time"], end_time=test["end_time"],
+                         doc_name=doc_name, resource=resource, metrics=plots[resource], timeseries=timeseries))
+    return jobs
 
-        fig = plt.figure(figsize=(cfg.FIGURE_SIZE_X, size_y))
-        ax1 = fig.add_subplot(111)
 
-        ###########################################################
+# Figures already set up for a resource and figure configuration, they are reused by only swapping their lines
+figure_templates = dict()
 
-        for metric in plots[resource]:
-            metric_name = metric[0]
-            line_color = None
-
-            # Hack to avoid plotting current and reserved in a non-serverless scenario
-            if metric_name == "structure.cpu.current" and test_name == "4.noserv_noacct":
-                continue
-            elif metric_name == "structure.cpu.used" and test_name == "4.noserv_noacct":
-                line_color = "tab:green"
-
-            # Get the time series data
-            if metric_name not in doc_ts or not doc_ts[metric_name]:
-                continue
-
-            timeseries = doc_ts[metric_name]
-
-            # This was done for users, for some reason
-            # timeseries = bdwatchdog_handler.perform_timeseries_range_apply(timeseries, 0, None)
-            ##
-
-            # Convert the time stamps to times relative to 0 (basetime)
-            basetime = int(list(timeseries.keys())[0])
-
-            ########### HOTFIX ################
-            ## For transcoding basic experiments for the Blockchain serverless paper
-            if cfg.SPLIT_LINEPLOTS_WHEN_TIME_GAPS:  # resource == "cpu":
-                t = basetime
-                splits = list()
-                for k, v in timeseries.items():
-                    if int(k) - t > 20:
-                        eprint((k, v, int(k), basetime))
-                        splits.append(int(k) - 5)
-                        splits.append(t + 5)
-                    t = int(k)
-                for s in splits:
-                    timeseries[str(s)] = np.nan
-            ########### HOTFIX ################
-
-            x = list(map(lambda point: int(point) - basetime, timeseries))
-
-            # Get the time series points and rebase them if necessary
-            y = rebase_ts_values(resource, timeseries)
-
-            data = zip(x, y)
-            data = sorted(data)
-            x = [p[0] for p in data]
-            y = [p[1] for p in data]
-
-            # Set the maximum and minimum time series time and value points
-            max_y_ts_point_value = max(max_y_ts_point_value, max(y))
-            max_x_ts_point_value = max(max_x_ts_point_value, max(x))
-            min_y_ts_point_value = min(min_y_ts_point_value, min(y))
-
-            # Get the line style
-            linestyle = line_style[resource][metric_name]
-
-            ax1.plot(x, y,
-                     label=translate_metric(metric_name, test_name),
-                     linestyle=linestyle,
-                     dashes=dashes_dict[linestyle],
-                     marker=line_marker[resource][metric_name],
-                     markersize=6,
-                     markevery=cfg.LINE_MARK_EVERY,
-                     color=line_color
-                     )
-
-        # Set x and y limits
-        top, bottom = max_y_ts_point_value, min_y_ts_point_value
-        left, right = -30, max_x_ts_point_value + 30
-
-        # If not static limits apply an amplification factor or the max timeseries value will be at the plot "ceiling"
-        if not cfg.STATIC_LIMITS:
-            top = math.ceil(top * cfg.Y_AMPLIFICATION_FACTOR)
-            bottom -= abs(math.floor(bottom * (cfg.Y_AMPLIFICATION_FACTOR - 1)))
-
-        eprint((resource, top, bottom, left, right))
-
-        plt.xlim(left=left, right=right)
-        plt.ylim(top=top, bottom=bottom)
 
-        ########### HOTFIX ################
-        if bottom < 0 and resource == "accounting":
-            # Make the 0 line thicker
-            ax1.axhline(linewidth=1.5, color="red")
-            # ax1.axvline(linewidth=1, color="k")
-        ########### HOTFIX ################
+def get_figure_template(resource, cfg):
+    size_y = cfg.FIGURE_SIZE_Y
+    if cfg.SINGLE_PLOT_WITH_XLABEL:
+        if resource == cfg.SINGLE_PLOT_WITH_XLABEL:
+            size_y *= 1.1
+
+    print_xlabel = not cfg.SINGLE_PLOT_WITH_XLABEL or resource == cfg.SINGLE_PLOT_WITH_XLABEL
+    hide_xticks_labels = cfg.SINGLE_PLOT_WITH_XTICKS and resource != cfg.SINGLE_PLOT_WITH_XLABEL
+    key = (resource, cfg.FIGURE_SIZE_X, size_y, cfg.STATIC_LIMITS, print_xlabel, hide_xticks_labels,
+           cfg.RESOURCE_X_LABELSEP[resource])
+
+    if key not in figure_templates:
+        fig = Figure(figsize=(cfg.FIGURE_SIZE_X, size_y))
+        ax1 = fig.add_subplot(111)
 
         # Set properties to the whole plot
-        if cfg.SINGLE_PLOT_WITH_XLABEL:
-            if resource == cfg.SINGLE_PLOT_WITH_XLABEL:
-                plt.xlabel('Time(s)', fontsize=12)
+        if print_xlabel:
+            ax1.set_xlabel('Time(s)', fontsize=12)
+        ax1.set_title('')
+        ax1.grid(True)
+        ax1.yaxis.set_major_formatter(FormatStrFormatter("%5d"))
+
+        # Tweak this parameter to position the ylabel closer or farther from the yticks
+        # This indirectly affects the size and thus, allows to align several different plot resources in column in
+        # Latex
+        ax1.yaxis.set_label_coords(cfg.RESOURCE_X_LABELSEP[resource], 0.5)
+        figure_templates[key] = (fig, ax1, hide_xticks_labels)
+
+    fig, ax1, hide_xticks_labels = figure_templates[key]
+
+    # Remove the lines and legend of the previous plot, and restart the colors cycle
+    for line in list(ax1.lines):
+        line.remove()
+    if ax1.get_legend():
+        ax1.get_legend().remove()
+    ax1.set_prop_cycle(None)
+
+    return fig, ax1, hide_xticks_labels
+
+
+def get_plot_directory(job):
+    return "{0}/{1}".format("timeseries_plots", job["test_name"])
+
+
+def get_plot_files(job, cfg):
+    return ["{0}_{1}.{2}".format(job["doc_name"], job["resource"], fmt) for fmt in ["svg", "png"]
+            if fmt in cfg.PLOTTING_FORMATS]
+
+
+def get_plot_digest(job, cfg):
+    # Hash of everything a plot depends on, its timeseries and the config keys used to draw it, so that a plot is only
+    # generated again if any of them changes
+    doc_name, resource = job["doc_name"], job["resource"]
+    if cfg.STATIC_LIMITS:
+        xlim = cfg.XLIM.get(doc_name, cfg.XLIM["default"])
+        if doc_name not in cfg.YLIM or resource not in cfg.YLIM[doc_name]:
+            ylim, ymin = cfg.YLIM["default"][resource], cfg.YMIN["default"][resource]
         else:
-            plt.xlabel('Time(s)', fontsize=12)
+            ylim, ymin = cfg.YLIM[doc_name][resource], cfg.YMIN[doc_name][resource]
+        yticks_step = cfg.YTICKS_STEP[resource]
+    else:
+        xlim, ylim, ymin, yticks_step = None, None, None, None
+
+    config_values = dict(STATIC_LIMITS=cfg.STATIC_LIMITS, XLIM=xlim, YLIM=ylim, YMIN=ymin, YTICKS_STEP=yticks_step,
+                         XTICKS_STEP=cfg.XTICKS_STEP, FIGURE_SIZE_X=cfg.FIGURE_SIZE_X,
+                         FIGURE_SIZE_Y=cfg.FIGURE_SIZE_Y, Y_AMPLIFICATION_FACTOR=cfg.Y_AMPLIFICATION_FACTOR,
+                         RESOURCE_X_LABELSEP=cfg.RESOURCE_X_LABELSEP[resource], PRINT_Y_LABEL=cfg.PRINT_Y_LABEL,
+                         LINE_MARK_EVERY=cfg.LINE_MARK_EVERY, SINGLE_PLOT_WITH_XLABEL=cfg.SINGLE_PLOT_WITH_XLABEL,
+                         SINGLE_PLOT_WITH_XTICKS=cfg.SINGLE_PLOT_WITH_XTICKS,
+                         SPLIT_LINEPLOTS_WHEN_TIME_GAPS=cfg.SPLIT_LINEPLOTS_WHEN_TIME_GAPS,
+                         LINEPLOT_MAX_POINTS=cfg.LINEPLOT_MAX_POINTS,
+                         PLOTTING_FORMATS=sorted(cfg.PLOTTING_FORMATS))
+
+    parts = [job["test_name"], doc_name, resource, job["metrics"], job["start_time"], job["end_time"], config_values]
+    for metric_name in sorted(job["timeseries"]):
+        timeseries = job["timeseries"][metric_name]
+        parts += [metric_name, timeseries.timestamps, timeseries.values]
+    return get_digest(*parts)
+
+
+def plot_test_doc(test, doc_name, plots, cfg):
+    render_plots(get_plot_jobs(test, doc_name, plots, cfg), cfg)
 
-        if cfg.PRINT_Y_LABEL:
-            plt.ylabel(translate_plot_name_to_ylabel(resource), style="italic", weight="bold", fontsize=13)
+
+def plot_test_resource(job, cfg):
+    def add_xticks():
+        if cfg.STATIC_LIMITS:
+            ticks = np.arange(0, right, step=cfg.XTICKS_STEP)
         else:
-            plt.ylabel(".", color="white") # This is so that the tweak of label space has effect
+            ticks = np.arange(0, int(end_time) - int(start_time), step=cfg.XTICKS_STEP)
+            # May be inaccurate up to +- 'downsample' seconds,
+            # because the data may start a little after the specified 'start' time or end
+            # a little before the specified 'end' time
 
-        ########### HOTFIX ################
-        if "noserv_noacct" in test_name or "noserv_acct" in test_name:
-            plt.ylabel(".", color="white")  # This is so that the tweak of label space has effect
-        ########### HOTFIX ################
+        ROTATION = 0
+        HORIZONTAL_ALIGN = "right"
+        labels = ["{0}".format(t) for t in ticks]
+        ax1.set_xticks(ticks)
+        ax1.set_xticklabels(labels, rotation=ROTATION, ha=HORIZONTAL_ALIGN)
 
-        plt.title('')
-        plt.grid(True)
-        
-        ########### HOTFIX ################
-        handles, labels = plt.gca().get_legend_handles_labels()
-        if resource == "accounting":
-            custom_order = ['Balance', 'Single task cost', 'Max allowed debt']
-            # Get current handles and labels
-            handles, labels = plt.gca().get_legend_handles_labels()
-            # Build a dict to map labels to handles
-            label_to_handle = dict(zip(labels, handles))
-            # Sort handles and labels by custom order
-            sorted_labels = [label for label in custom_order if label in label_to_handle]
-            sorted_handles = [label_to_handle[label] for label in sorted_labels]
+    start_time, end_time = job["start_time"], job["end_time"]
+    test_name, doc_name, resource = job["test_name"], job["doc_name"], job["resource"]
+    doc_ts = job["timeseries"]
+
+    # Values used for setting the X and Y limits, without depending on actual time series values ####
+    if cfg.STATIC_LIMITS:
+        if doc_name not in cfg.XLIM:
+            max_x_ts_point_value = cfg.XLIM["default"]
         else:
-            sorted_labels = labels
-            sorted_handles = handles
-        ########### HOTFIX ################
-        
-        plt.legend(sorted_handles,
-                   sorted_labels,
-                   loc='upper right',
-                   shadow=False,
-                   fontsize=LEGEND_FONTSIZE,
-                   fancybox=True,
-                   facecolor='#afeeee',
-                   labelspacing=0.15,
-                   handletextpad=0.18,
-                   borderpad=0.22,
-                   framealpha=1)
+            max_x_ts_point_value = cfg.XLIM[doc_name]
+        if doc_name not in cfg.YLIM or resource not in cfg.YLIM[doc_name]:
+            max_y_ts_point_value = cfg.YLIM["default"][resource]
+            min_y_ts_point_value = cfg.YMIN["default"][resource]
+        else:
+            max_y_ts_point_value = cfg.YLIM[doc_name][resource]
+            min_y_ts_point_value = cfg.YMIN[doc_name][resource]
+    else:
+        max_y_ts_point_value, max_x_ts_point_value = 0, 0
+        min_y_ts_point_value = 0
 
-        ########### HOTFIX ################
-        ## For transcoding basic experiments for the Blockchain serverless paper
-        if test_name == "2.serv_noacct" and resource == "cpu":
-            plt.legend(loc='upper left',
-                       shadow=False,
-                       fontsize=LEGEND_FONTSIZE,
-                       fancybox=True,
-                       facecolor='#afeeee',
-                       labelspacing=0.15,
-                       handletextpad=0.18,
-                       borderpad=0.22,
-                       framealpha=1)
-        ########### HOTFIX ################
+    fig, ax1, hide_xticks_labels = get_figure_template(resource, cfg)
 
-        # if resource == "cpu":
-        #     plt.axvline(x=4080, ymin=0.05, ymax=0.95, color='red', label='axvline - % of full height')
+    ###########################################################
 
-        ax1.yaxis.set_major_formatter(FormatStrFormatter("%5d"))
+    for metric in job["metrics"]:
+        metric_name = metric[0]
+        line_color = None
 
-        # ADD YTICKS
-        if cfg.STATIC_LIMITS:
-            plt.yticks(np.arange(math.ceil(bottom), math.ceil(top), step=cfg.YTICKS_STEP[resource]))
+        # Hack to avoid plotting current and reserved in a non-serverless scenario
+        if metric_name == "structure.cpu.current" and test_name == "4.noserv_noacct":
+            continue
+        elif metric_name == "structure.cpu.used" and test_name == "4.noserv_noacct":
+            line_color = "tab:green"
 
-        # ADD XTICKS
-        add_xticks()
-        if cfg.SINGLE_PLOT_WITH_XTICKS:
-            if resource != cfg.SINGLE_PLOT_WITH_XLABEL:
-                # Hide the xticks labels, keep the lines
-                for tick in ax1.xaxis.get_major_ticks():
-                    tick.tick1line.set_visible(True)
-                    tick.label1.set_visible(False)
+        # Get the time series data
+        if metric_name not in doc_ts or not doc_ts[metric_name]:
+            continue
 
-        # Add small pad as otherwise matplotlib might trim some letters on the left side,
-        # or the plots' black box from the right side
-        PAD_INCHES = 0.03
+        timeseries = doc_ts[metric_name]
 
-        # Tweak this parameter to position the ylabel closer or farther from the yticks
-        # This indirectly affects the size and thus, allows to align several different plot resources in column in Latex
-        ax1.yaxis.set_label_coords(cfg.RESOURCE_X_LABELSEP[resource], 0.5)
+        # This was done for users, for some reason
+        # timeseries = bdwatchdog_handler.perform_timeseries_range_apply(timeseries, 0, None)
+        ##
 
-        # Save the plots
-        figure_filepath_directory = "{0}/{1}".format("timeseries_plots", test_name)
-        if "svg" in cfg.PLOTTING_FORMATS:
-            figure_name = "{0}_{1}.{2}".format(doc_name, resource, "svg")
-            save_figure(figure_filepath_directory, figure_name, fig, format="svg", pad_inches=PAD_INCHES)
+        # Convert the time stamps to times relative to 0 (basetime)
+        basetime = int(timeseries.timestamps[0])
+        timestamps, values = timeseries.timestamps, timeseries.values
 
-        if "png" in cfg.PLOTTING_FORMATS:
-            figure_name = "{0}_{1}.{2}".format(doc_name, resource, "png")
-            save_figure(figure_filepath_directory, figure_name, fig, format="png", pad_inches=PAD_INCHES)
+        ########### HOTFIX ################
+        ## For transcoding basic experiments for the Blockchain serverless paper
+        if cfg.SPLIT_LINEPLOTS_WHEN_TIME_GAPS:  # resource == "cpu":
+            # Add NaN points right after and right before every gap so that the line is split
+            # The series may have been retrieved with a coarser downsample, so the gaps are relative to its step
+            diffs = np.diff(timestamps)
+            step = max(5, int(np.median(diffs))) if diffs.size else 5
+            gaps = np.flatnonzero(diffs > max(20, 4 * step))
+            for gap in gaps.tolist():
+                eprint((int(timestamps[gap + 1]), values[gap + 1], int(timestamps[gap + 1]), basetime))
+            if gaps.size:
+                splits = np.concatenate((timestamps[gaps + 1] - step, timestamps[gaps] + step))
+                timestamps = np.concatenate((timestamps, splits))
+                values = np.concatenate((values, np.full(splits.size, np.nan)))
+                order = np.argsort(timestamps, kind="stable")
+                timestamps, values = timestamps[order], values[order]
+        ########### HOTFIX ################
 
-        plt.close()
+        x = timestamps - basetime
+
+        # Get the time series points and rebase them if necessary
+        y = rebase_ts_values(resource, values)
+
+        # Set the maximum and minimum time series time and value points
+        max_y_ts_point_value = max(max_y_ts_point_value, np.nanmax(y))
+        max_x_ts_point_value = max(max_x_ts_point_value, x.max())
+        min_y_ts_point_value = min(min_y_ts_point_value, np.nanmin(y))
+
+        # Only draw as many points as can be told apart, the limits above still use all the points
+        x, y = decimate_line(x, y, cfg.LINEPLOT_MAX_POINTS)
+
+        # Get the line style
+        linestyle = line_style[resource][metric_name]
+
+        ax1.plot(x, y,
+                 label=translate_metric(metric_name, test_name),
+                 linestyle=linestyle,
+                 dashes=dashes_dict[linestyle],
+                 marker=line_marker[resource][metric_name],
+                 markersize=6,
+                 markevery=cfg.LINE_MARK_EVERY,
+                 color=line_color
+                 )
+
+    # Set x and y limits
+    top, bottom = max_y_ts_point_value, min_y_ts_point_value
+    left, right = -30, max_x_ts_point_value + 30
+
+    # If not static limits apply an amplification factor or the max timeseries value will be at the plot "ceiling"
+    if not cfg.STATIC_LIMITS:
+        top = math.ceil(top * cfg.Y_AMPLIFICATION_FACTOR)
+        bottom -= abs(math.floor(bottom * (cfg.Y_AMPLIFICATION_FACTOR - 1)))
+
+    eprint((resource, top, bottom, left, right))
+
+    ax1.set_xlim(left=left, right=right)
+    ax1.set_ylim(top=top, bottom=bottom)
+
+    ########### HOTFIX ################
+    if bottom < 0 and resource == "accounting":
+        # Make the 0 line thicker
+        ax1.axhline(linewidth=1.5, color="red")
+        # ax1.axvline(linewidth=1, color="k")
+    ########### HOTFIX ################
+
+    # The ylabel may change between plots, so all its properties are set every time
+    hidden_ylabel = not cfg.PRINT_Y_LABEL
+    ########### HOTFIX ################
+    if "noserv_noacct" in test_name or "noserv_acct" in test_name:
+        hidden_ylabel = True
+    ########### HOTFIX ################
+
+    if hidden_ylabel:
+        # This is so that the tweak of label space has effect
+        ax1.set_ylabel(".", color="white", style="normal", weight="normal",
+                       fontsize=matplotlib.rcParams["axes.labelsize"])
+    else:
+        ax1.set_ylabel(translate_plot_name_to_ylabel(resource), style="italic", weight="bold", fontsize=13,
+                       color=matplotlib.rcParams["axes.labelcolor"])
+
+    ########### HOTFIX ################
+    handles, labels = ax1.get_legend_handles_labels()
+    if resource == "accounting":
+        custom_order = ['Balance', 'Single task cost', 'Max allowed debt']
+        # Get current handles and labels
+        handles, labels = ax1.get_legend_handles_labels()
+        # Build a dict to map labels to handles
+        label_to_handle = dict(zip(labels, handles))
+        # Sort handles and labels by custom order
+        sorted_labels = [label for label in custom_order if label in label_to_handle]
+        sorted_handles = [label_to_handle[label] for label in sorted_labels]
+    else:
+        sorted_labels = labels
+        sorted_handles = handles
+    ########### HOTFIX ################
+    
+    ax1.legend(sorted_handles,
+               sorted_labels,
+               loc='upper right',
+               shadow=False,
+               fontsize=LEGEND_FONTSIZE,
+               fancybox=True,
+               facecolor='#afeeee',
+               labelspacing=0.15,
+               handletextpad=0.18,
+               borderpad=0.22,
+               framealpha=1)
+
+    ########### HOTFIX ################
+    ## For transcoding basic experiments for the Blockchain serverless paper
+    if test_name == "2.serv_noacct" and resource == "cpu":
+        ax1.legend(loc='upper left',
+                   shadow=False,
+                   fontsize=LEGEND_FONTSIZE,
+                   fancybox=True,
+                   facecolor='#afeeee',
+                   labelspacing=0.15,
+                   handletextpad=0.18,
+                   borderpad=0.22,
+                   framealpha=1)
+    ########### HOTFIX ################
+
+    # if resource == "cpu":
+    #     plt.axvline(x=4080, ymin=0.05, ymax=0.95, color='red', label='axvline - % of full height')
+
+    # ADD YTICKS
+    if cfg.STATIC_LIMITS:
+        ax1.set_yticks(np.arange(math.ceil(bottom), math.ceil(top), step=cfg.YTICKS_STEP[resource]))
+
+    # ADD XTICKS
+    add_xticks()
+    if hide_xticks_labels:
+        # Hide the xticks labels, keep the lines
+        for tick in ax1.xaxis.get_major_ticks():
+            tick.tick1line.set_visible(True)
+            tick.label1.set_visible(False)
+
+    # Add small pad as otherwise matplotlib might trim some letters on the left side,
+    # or the plots' black box from the right side
+    PAD_INCHES = 0.03
+
+    # Save the plots
+    figure_filepath_directory = get_plot_directory(job)
+    for figure_name in get_plot_files(job, cfg):
+        save_figure(figure_filepath_directory, figure_name, fig, format=figure_name.rsplit(".", 1)[1],
+                    pad_inches=PAD_INCHES)
@@ -0,0 +1,129 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.common import tracing
+from src.common.config import eprint
+from src.common.manifest import PlotManifest
+
+# Config of the worker processes, it is sent once when each worker starts instead of with every job
+worker_cfg = None
+
+
+def init_worker(cfg, trace=False):
+    global worker_cfg
+    worker_cfg = cfg
+    if trace:
+        # Forked workers inherit the events of the main process, that are already recorded there
+        tracing.pop_events()
+        tracing.enable()
+        tracing.name_process("plotting worker")
+
+    # Workers never show figures, so the non-interactive backend is used
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def get_job_name(job):
+    return "{0}/{1}_{2}".format(job["test_name"], job["doc_name"], job["resource"])
+
+
+def run_job(job, cfg=None):
+    from src.lineplotting.lineplots import plot_test_resource
+    if cfg is None:
+        cfg = worker_cfg
+    start = time.time()
+    with tracing.span("plot", category="matplotlib", plot=get_job_name(job)):
+        plot_test_resource(job, cfg)
+    return get_job_name(job), time.time() - start
+
+
+def run_worker_job(job):
+    # The trace events of the job are sent back to the main process along with its timing
+    return run_job(job), tracing.pop_events()
+
+
+def get_outdated_jobs(jobs, cfg):
+    # Keep only the jobs whose plot inputs changed since the plot was last generated, along with their digests
+    from src.lineplotting.lineplots import get_plot_directory, get_plot_files, get_plot_digest
+    manifests = dict()
+    outdated_jobs = list()
+    for job in jobs:
+        directory = get_plot_directory(job)
+        if directory not in manifests:
+            manifests[directory] = PlotManifest(directory)
+        file_paths = ["{0}/{1}".format(directory, figure_name) for figure_name in get_plot_files(job, cfg)]
+        digest = get_plot_digest(job, cfg)
+        if manifests[directory].is_up_to_date(get_job_name(job), digest, file_paths):
+            eprint("Plot '{0}' is up to date, skipping".format(get_job_name(job)))
+            continue
+        outdated_jobs.append((job, directory, digest, file_paths))
+    return outdated_jobs, manifests
+
+
+def render_plots(jobs, cfg):
+    # Render the plot jobs, in parallel on a pool of processes if more than one worker is configured
+    # The output path of each plot only depends on its job, so the result is the same no matter the order
+    wall_start = time.time()
+    timings = list()
+    if cfg.INCREMENTAL_PLOTS:
+        outdated_jobs, manifests = get_outdated_jobs(jobs, cfg)
+    else:
+        outdated_jobs, manifests = [(job, None, None, None) for job in jobs], dict()
+    jobs = [outdated_job[0] for outdated_job in outdated_jobs]
+
+    # The manifests are only written from this process, once their plots have been saved
+    try:
+        if cfg.PLOTTING_WORKERS > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(cfg.PLOTTING_WORKERS, len(jobs)), initializer=init_worker,
+                                     initargs=(cfg, tracing.is_enabled())) as executor:
+                for timing, events in executor.map(run_worker_job, jobs):
+                    timings.append(timing)
+                    tracing.add_events(events)
+        else:
+            for job in jobs:
+                timings.append(run_job(job, cfg))
+    finally:
+        for (job, directory, digest, file_paths), _ in zip(outdated_jobs, timings):
+            if digest:
+                manifests[directory].record(get_job_name(job), digest, file_paths)
+        for manifest in manifests.values():
+            manifest.save()
+
+    print_timing_summary(timings, time.time() - wall_start)
+    return timings
+
+
+def print_timing_summary(timings, wall_time):
+    if not timings:
+        return
+    for job_name, elapsed in timings:
+        eprint("Rendered plot '{0}' in {1:.2f} seconds".format(job_name, elapsed))
+    total = sum(elapsed for _, elapsed in timings)
+    slowest_name, slowest_time = max(timings, key=lambda timing: timing[1])
+    eprint("Rendered {0} plots in {1:.2f} seconds (rendering time {2:.2f} seconds, average {3:.2f}, "
+           "slowest '{4}' with {5:.2f})".format(len(timings), wall_time, total, total / len(timings),
+                                                 slowest_name, slowest_time))
@@ -23,22 +23,48 @@
 
 from __future__ import print_function
 
-import sys
+import argparse
 
-from src.common.config import MongoDBConfig, eprint
-from src.ExperimentReporter import ExperimentReporter
-from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the report of an experiment")
+    parser.add_argument("experiment_name", help="Name of the experiment")
+    parser.add_argument("--from-archive", dest="archive_path", default=None,
+                        help="Generate the report from an experiment archive instead of from MongoDB and OpenTSDB")
+    parser.add_argument("--trace", dest="trace_path", default=None,
+                        help="Write a Chrome trace (chrome://tracing, Perfetto) of the report generation to this file")
+    args = parser.parse_args()
 
-mongoDBConfig = MongoDBConfig()
-timestampingAgent = MongoDBTimestampAgent(mongoDBConfig.get_config_as_dict())
+    # The report generator is imported once the arguments are parsed, so that '--help' (or a mistake) answers at once
+    from src.common import tracing
+    from src.common.config import MongoDBConfig, eprint
+    from src.ExperimentReporter import ExperimentReporter
+    from src.opentsdb import bdwatchdog
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Must specify an experiment name as the first argument")
-    else:
-        experiment_name = sys.argv[1]
-        experiment = timestampingAgent.get_experiment(experiment_name, mongoDBConfig.get_username())
-        if experiment:
-            ExperimentReporter(experiment_name).report_experiment(experiment)
-        else:
-            eprint("Experiment '{0}' not found".format(experiment_name))
+    if args.trace_path:
+        tracing.enable()
+        tracing.name_process("report generator")
+
+    experiment_name = args.experiment_name
+    try:
+        with tracing.span("report", experiment=experiment_name):
+            if args.archive_path:
+                ExperimentReporter(experiment_name).report_experiment_from_archive(args.archive_path)
+            else:
+                from TimestampsSnitch.src.mongodb.mongodb_agent import MongoDBTimestampAgent
+                mongoDBConfig = MongoDBConfig()
+                timestampingAgent = MongoDBTimestampAgent(mongoDBConfig.get_config_as_dict())
+
+                with tracing.span("get_experiment", category="mongodb"):
+                    experiment = timestampingAgent.get_experiment(experiment_name, mongoDBConfig.get_username())
+                if experiment:
+                    ExperimentReporter(experiment_name, timestampingAgent).report_experiment(experiment)
+                    bdw = bdwatchdog.get_client()
+                    if bdw.cache:
+                        eprint(bdw.cache.get_stats_message())
+                    eprint(bdw.get_stats_message())
+                else:
+                    eprint("Experiment '{0}' not found".format(experiment_name))
+    finally:
+        if args.trace_path:
+            tracing.write_trace(args.trace_path)
+            eprint("Trace written to '{0}'".format(args.trace_path))
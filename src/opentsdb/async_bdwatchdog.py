@@ -0,0 +1,90 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.common.timeseries import Timeseries
+from src.common.tracing import wrap_context
+from src.opentsdb.bdwatchdog import BDWatchdog
+
+
+class AsyncBDWatchdog:
+    # asyncio front-end of the BDWatchdog client, the blocking requests to OpenTSDB are run on a shared pool of
+    # threads whose size bounds the number of queries in flight for the whole process, no matter how many event
+    # loops (e.g., one per test being retrieved) are using this client
+    def __init__(self, config, bdwatchdog_handler=None):
+        if bdwatchdog_handler:
+            self.bdwatchdog_handler = bdwatchdog_handler
+        else:
+            self.bdwatchdog_handler = BDWatchdog(config)
+        self.max_in_flight = max(1, int(config.getMaxInFlight()))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="opentsdb")
+        self.chunk_seconds = max(0, int(config.getQueryChunkSeconds()))
+
+    async def get_points(self, query):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, wrap_context(self.bdwatchdog_handler.get_points, query))
+
+    async def get_timeseries(self, structure_name, start, end, retrieve_metrics, downsample=5):
+        # Long windows are retrieved in time chunks concurrently and then joined
+        chunks = await self.__run_chunks(self.bdwatchdog_handler.get_timeseries, structure_name, start, end,
+                                         retrieve_metrics, downsample)
+        return self.join_chunks(chunks)
+
+    async def get_structures_timeseries(self, structure_names, start, end, retrieve_metrics, downsample=5):
+        chunks = await self.__run_chunks(self.bdwatchdog_handler.get_structures_timeseries, structure_names, start,
+                                         end, retrieve_metrics, downsample)
+        return {structure_name: self.join_chunks([chunk[structure_name] for chunk in chunks])
+                for structure_name in structure_names}
+
+    async def __run_chunks(self, function, structures, start, end, retrieve_metrics, downsample):
+        loop = asyncio.get_running_loop()
+        chunks = BDWatchdog.get_query_chunks(start, end, downsample, self.chunk_seconds)
+        return await asyncio.gather(*(
+            loop.run_in_executor(self.executor, wrap_context(function, structures, chunk_start, chunk_end,
+                                                             retrieve_metrics, downsample))
+            for chunk_start, chunk_end in chunks))
+
+    @staticmethod
+    def join_chunks(chunks):
+        # Join the timeseries of every metric, in chunk order
+        if len(chunks) == 1:
+            return chunks[0]
+        joined = dict()
+        for metric_name in chunks[0]:
+            joined[metric_name] = Timeseries.concatenate([chunk[metric_name] for chunk in chunks])
+        return joined
+
+    async def gather(self, coroutines):
+        # Only 'max_in_flight' coroutines are awaited at the same time, the rest wait on the semaphore without
+        # submitting anything, so that hundreds of queries can be issued without flooding OpenTSDB or the executor
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+
+    def run(self, coroutines):
+        # Blocking entry point for synchronous code, returns the results in the same order as the coroutines
+        return asyncio.run(self.gather(coroutines))
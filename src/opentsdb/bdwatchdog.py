@@ -19,16 +19,55 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import random
 import sys
+import threading
+import time
 
 import requests
 import json
 
-from src.common.config import eprint
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+from src.common.aggregation import aggregate_timeseries
+from src.common.config import OpenTSDBConfig, eprint
+from src.common.timeseries import Timeseries
+from src.common.tracing import span
+from src.opentsdb.breaker import CircuitBreaker, CircuitOpenError
+from src.opentsdb.cache import QueryCache
+from src.opentsdb.decoding import ResponseDecoder
+from src.opentsdb.hedging import Hedger
+
+
+class RetryableStatusError(requests.HTTPError):
+    pass
+
+
+# Errors after which a query is retried, OpenTSDB answers with these status codes when overloaded or restarting
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                RetryableStatusError)
+
+# Client shared by the whole process, see 'get_client'
+shared_client = None
+shared_client_lock = threading.Lock()
+
+
+def get_client(config=None):
+    # All the modules use the same client, so that its pool of connections, cache, circuit breaker and counters
+    # are shared
+    global shared_client
+    with shared_client_lock:
+        if shared_client is None:
+            shared_client = BDWatchdog(config if config else OpenTSDBConfig())
+        return shared_client
 
 
 class BDWatchdog:
     NO_METRIC_DATA_DEFAULT_VALUE = 0  # -1
+    DECODE_CHUNK_SIZE = 256 * 1024
 
     def __init__(self, config):
         self.server = "http://{0}:{1}{2}".format(
@@ -36,49 +75,311 @@ class BDWatchdog:
             str(int(config.getPort())),
             config.getSubdir())
         self.session = requests.Session()
+        pool_size = max(1, int(config.getPoolSize()))
+        hedging = config.getHedging() == "true"
+        # A hedged query may hold two connections at once, so the pool is sized for the hedger workers
+        if hedging:
+            pool_size *= 2
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip"})
+        self.timeout = (float(config.getConnectTimeout()), float(config.getReadTimeout()))
+        # Whole time a query may take, including the retrieval of its response, 0 disables it
+        self.deadline = float(config.getRequestDeadline())
+        self.max_tries = max(1, int(config.getMaxTries()))
+        self.backoff_base, self.backoff_max = float(config.getBackoffBase()), float(config.getBackoffMax())
+        self.breaker = CircuitBreaker(config.getBreakerThreshold(), config.getBreakerCooldown())
+        self.hedger = None
+        if hedging:
+            self.hedger = Hedger(config.getHedgePercentile(), config.getHedgeMinDelay(), config.getHedgeBudget(),
+                                 pool_size)
+        self.requests, self.retries, self.failures = 0, 0, 0
+        self.counters_lock = threading.Lock()
+        self.cache = QueryCache.from_config(config)
+        self.streaming_decode = config.getStreamingDecode() == "true"
+        # OpenTSDB returns the points as lists of [timestamp, value] pairs instead of dictionaries
+        self.params = {"arrays": "true"} if config.getArraysResponse() == "true" else None
 
-    def get_points(self, query, tries=3):
-        try:
-            r = self.session.post(self.server + "/api/query",
-                                  data=json.dumps(query),
-                                  headers={'content-type': 'application/json', 'Accept': 'application/json'})
+    def get_points(self, query, tries=None):
+        with span("opentsdb_query", category="opentsdb", metrics=[q["metric"] for q in query["queries"]],
+                  start=query["start"], end=query["end"]):
+            return self.__get_points(query, tries if tries else self.max_tries)
+
+    def __get_points(self, query, tries):
+        # The query is retried on connection errors, timeouts and server errors, waiting an exponential backoff
+        # with full jitter between tries, unless the circuit breaker is open
+        attempt = 0
+        while True:
+            try:
+                self.breaker.check()
+            except CircuitOpenError:
+                self.__count_failure()
+                raise
+            try:
+                self.__count_request()
+                if self.hedger:
+                    result = self.hedger.run(lambda cancelled: self.__post_query(query, cancelled))
+                else:
+                    result = self.__post_query(query)
+            except RETRY_ERRORS as e:
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt >= tries:
+                    self.__count_failure()
+                    eprint("Error with request {0} after {1} tries: {2}".format(json.dumps(query), attempt, str(e)))
+                    raise e
+                with self.counters_lock:
+                    self.retries += 1
+                time.sleep(self.get_backoff(attempt))
+            except Exception:
+                # The server answered, even if with an error, so it is not considered as failing
+                self.breaker.record_success()
+                self.__count_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def __post_query(self, query, cancelled=None):
+        started = time.monotonic()
+        # The body is always read in chunks, so that the deadline is enforced whether it is decoded as it arrives
+        # or once it is complete
+        r = self.session.post(self.server + "/api/query",
+                              data=json.dumps(query), params=self.params, stream=True,
+                              timeout=self.get_timeout(),
+                              headers={'content-type': 'application/json', 'Accept': 'application/json'})
+        with r:
             if r.status_code == 200:
+                if self.streaming_decode:
+                    return self.decode_response(r, self.get_size_hint(query), started, cancelled)
+                content = self.read_response(r, started, cancelled)
+                if content is None:
+                    return []
                 try:
-                    return json.loads(r.text)
-                except json.decoder.JSONDecodeError:
+                    return json.loads(content)
+                except (json.decoder.JSONDecodeError, UnicodeDecodeError):
                     eprint("Error decoding the response from OpenTSDB. Text retrieved is next:")
-                    eprint(r.text)
+                    eprint(content.decode("utf-8", errors="replace"))
                     return []
+            elif r.status_code in RETRY_STATUS_CODES:
+                raise RetryableStatusError("OpenTSDB answered with status {0}".format(r.status_code), response=r)
             else:
                 eprint("Error with request {0}".format(json.dumps(query)))
                 r.raise_for_status()
-        except requests.ConnectionError as e:
-            tries -= 1
-            if tries <= 0:
-                raise e
-            else:
-                self.get_points(query, tries)
+
+    def get_timeout(self):
+        # No single read may wait longer than the whole query is allowed to take
+        connect_timeout, read_timeout = self.timeout
+        if self.deadline:
+            read_timeout = min(read_timeout, self.deadline)
+        return connect_timeout, read_timeout
+
+    def check_deadline(self, started):
+        if started and self.deadline and time.monotonic() - started > self.deadline:
+            raise requests.Timeout("OpenTSDB query exceeded its deadline of {0} seconds".format(self.deadline))
+
+    def iter_response(self, r):
+        # The body is yielded as it arrives instead of in full chunks, so that the deadline is checked even when the
+        # server sends it slowly, the errors are translated as requests does
+        read1 = getattr(r.raw, "read1", None)
+        if read1 is None:
+            yield from r.iter_content(chunk_size=self.DECODE_CHUNK_SIZE)
+            return
+        while True:
+            try:
+                data = read1(self.DECODE_CHUNK_SIZE, decode_content=True)
+            except ProtocolError as e:
+                raise requests.exceptions.ChunkedEncodingError(e)
+            except DecodeError as e:
+                raise requests.exceptions.ContentDecodingError(e)
+            except ReadTimeoutError as e:
+                raise requests.ConnectionError(e)
+            if not data:
+                return
+            yield data
+
+    def read_response(self, r, started=None, cancelled=None):
+        # The whole body of the response, or None if a hedged duplicate of this request already answered
+        chunks = list()
+        for data in self.iter_response(r):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            chunks.append(data)
+            self.check_deadline(started)
+        return b"".join(chunks)
+
+    def decode_response(self, r, size_hint, started=None, cancelled=None):
+        # The response is decoded as it arrives, without keeping its whole text nor a dictionary per series
+        decoder = ResponseDecoder(size_hint)
+        try:
+            for data in self.iter_response(r):
+                if cancelled is not None and cancelled.is_set():
+                    # A hedged duplicate of this request already answered
+                    return []
+                decoder.feed(data)
+                self.check_deadline(started)
+            return decoder.close()
+        except ValueError as e:
+            eprint("Error decoding the response from OpenTSDB: {0}".format(str(e)))
+            return []
+
+    def get_backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def __count_request(self):
+        with self.counters_lock:
+            self.requests += 1
+
+    def __count_failure(self):
+        with self.counters_lock:
+            self.failures += 1
+
+    def get_stats_message(self):
+        message = "OpenTSDB client: {0} requests, {1} retries, {2} failed queries, circuit breaker opened {3} " \
+                  "times".format(self.requests, self.retries, self.failures, self.breaker.times_opened)
+        if self.hedger:
+            message += ", " + self.hedger.get_stats_message()
+        return message
+
+    @staticmethod
+    def get_size_hint(query):
+        # Expected number of points per series, used to preallocate the buffers of the decoder
+        try:
+            downsample = int(query["queries"][0]["downsample"].split("s-")[0])
+            return (int(query["end"]) - int(query["start"])) // downsample + 1
+        except (KeyError, IndexError, ValueError):
+            return 0
 
     def get_timeseries(self, structure_name, start, end, retrieve_metrics, downsample=5):
-        usages = dict()
+        with span("cache_lookup", category="opentsdb", structure=structure_name):
+            usages, pending_metrics, _ = self.__lookup_cache([structure_name], start, end, retrieve_metrics,
+                                                             downsample)
+        usages = usages[structure_name]
+        if pending_metrics:
+            query = self.timeseries_query(structure_name, start, end, pending_metrics, downsample)
+            result = self.get_points(query)
+            usages.update(self.parse_timeseries(pending_metrics, result))
+            if result:
+                self.__store_cache({structure_name: usages}, [structure_name], start, end, pending_metrics, downsample)
+        return usages
+
+    def get_structures_timeseries(self, structure_names, start, end, retrieve_metrics, downsample=5):
+        with span("cache_lookup", category="opentsdb", structures=len(structure_names)):
+            usages, pending_metrics, pending_structures = self.__lookup_cache(structure_names, start, end,
+                                                                              retrieve_metrics, downsample)
+        if pending_metrics:
+            query = self.structures_timeseries_query(pending_structures, start, end, pending_metrics, downsample)
+            result = self.get_points(query)
+            with span("parse_response", category="opentsdb", structures=len(pending_structures)):
+                fetched = self.parse_structures_timeseries(pending_structures, pending_metrics, result)
+            for structure_name in pending_structures:
+                usages[structure_name].update(fetched[structure_name])
+            if result:
+                self.__store_cache(usages, pending_structures, start, end, pending_metrics, downsample)
+        return usages
+
+    def __lookup_cache(self, structure_names, start, end, retrieve_metrics, downsample):
+        # Returns the series found in the cache and the metrics and structures that still have to be retrieved
+        usages = self.parse_structures_timeseries(structure_names, retrieve_metrics, None)
+        if not self.cache or not self.cache.is_cacheable(end):
+            return usages, list(retrieve_metrics), list(structure_names)
+
+        pending_metrics, pending_structures = list(), list()
+        for metric_name, metric_tag in retrieve_metrics:
+            for structure_name in structure_names:
+                key = self.cache.get_key(self.server, metric_name, metric_tag, structure_name, start, end, downsample)
+                timeseries = self.cache.get(key)
+                if timeseries is None:
+                    if (metric_name, metric_tag) not in pending_metrics:
+                        pending_metrics.append((metric_name, metric_tag))
+                    if structure_name not in pending_structures:
+                        pending_structures.append(structure_name)
+                else:
+                    usages[structure_name][metric_name] = timeseries
+        return usages, pending_metrics, pending_structures
+
+    def __store_cache(self, usages, structure_names, start, end, retrieve_metrics, downsample):
+        if not self.cache or not self.cache.is_cacheable(end):
+            return
+        for metric_name, metric_tag in retrieve_metrics:
+            for structure_name in structure_names:
+                key = self.cache.get_key(self.server, metric_name, metric_tag, structure_name, start, end, downsample)
+                self.cache.put(key, usages[structure_name][metric_name])
+
+    @staticmethod
+    def get_query_chunks(start, end, downsample, chunk_seconds):
+        # Split a long time window in chunks whose boundaries are multiples of the downsample, so that every
+        # downsample bucket falls in a single chunk, each chunk ends a second before the next one starts
+        if not chunk_seconds or end - start <= chunk_seconds:
+            return [(start, end)]
+        start, end = int(start), int(end)
+        chunk_seconds = -(-int(chunk_seconds) // downsample) * downsample
+        bounds = list(range((start // chunk_seconds + 1) * chunk_seconds, end, chunk_seconds))
+        return list(zip([start] + bounds, [bound - 1 for bound in bounds] + [end]))
+
+    @staticmethod
+    def timeseries_query(structure_name, start, end, retrieve_metrics, downsample=5):
         subquery = list()
         for metric in retrieve_metrics:
             metric_name = metric[0]
             metric_tag = metric[1]
-            usages[metric_name] = dict()
             subquery.append(dict(aggregator='zimsum', metric=metric_name, tags={metric_tag: structure_name},
                                  downsample=str(downsample) + "s-avg"))
+        return dict(start=start, end=end, queries=subquery)
+
+    @staticmethod
+    def parse_timeseries(retrieve_metrics, result):
+        usages = dict()
+        for metric in retrieve_metrics:
+            usages[metric[0]] = Timeseries()
+
+        if result:
+            for metric in result:
+                metric_name = metric["metric"]
+                usages[metric_name] = BDWatchdog.get_result_timeseries(metric)
+
+        return usages
+
+    @staticmethod
+    def structures_timeseries_query(structure_names, start, end, retrieve_metrics, downsample=5):
+        # A single subquery per metric retrieves all the structures at once, the structure tag
+        # is filtered by the list of names and grouped by so that each structure gets its own timeseries
+        subquery = list()
+        for metric in retrieve_metrics:
+            metric_name = metric[0]
+            metric_tag = metric[1]
+            tag_filter = dict(type="literal_or", tagk=metric_tag, filter="|".join(structure_names), groupBy=True)
+            subquery.append(dict(aggregator='zimsum', metric=metric_name, filters=[tag_filter],
+                                 downsample=str(downsample) + "s-avg"))
+        return dict(start=start, end=end, queries=subquery)
 
-        query = dict(start=start, end=end, queries=subquery)
-        result = self.get_points(query)
+    @staticmethod
+    def parse_structures_timeseries(structure_names, retrieve_metrics, result):
+        # Initialize every structure with an empty timeseries per metric, as 'get_timeseries' does
+        usages = dict()
+        for structure_name in structure_names:
+            usages[structure_name] = dict()
+            for metric in retrieve_metrics:
+                usages[structure_name][metric[0]] = Timeseries()
+
+        metric_tags = dict(retrieve_metrics)
         if result:
             for metric in result:
-                dps = metric["dps"]
                 metric_name = metric["metric"]
-                usages[metric_name] = dps
+                structure_name = metric["tags"].get(metric_tags.get(metric_name))
+                if structure_name in usages:
+                    usages[structure_name][metric_name] = BDWatchdog.get_result_timeseries(metric)
 
         return usages
 
+    @staticmethod
+    def get_result_timeseries(result):
+        # The results of the streaming decoder already hold their timeseries
+        if "timeseries" in result:
+            return result["timeseries"]
+        return Timeseries.from_dps(result["dps"])
+
     @staticmethod
     def perform_timeseries_range_apply(timeseries, ymin=0, ymax=None):
         check_range = True
@@ -93,59 +394,22 @@ class BDWatchdog:
             check_range = False
 
         if check_range:
-            points = list(timeseries.items())
-            for point in points:
-                key = point[0]
-                value = point[1]
-                if value > ymax:
-                    timeseries[key] = ymax
-                elif ymin and value < ymin:
-                    timeseries[key] = ymin
+            values = timeseries.values
+            values[values > ymax] = ymax
+            if ymin:
+                values[values < ymin] = ymin
         return timeseries
 
     @staticmethod
     def perform_check_for_missing_metric_info(timeseries, max_diff_time=30):
         misses = list()
         if timeseries:
-            points = list(timeseries.items())
-            previous_timestamp = int(points[0][0])
-            for point in points[1:]:
-                timestamp = int(point[0])
-                diff_time = timestamp - previous_timestamp
-                if diff_time >= max_diff_time:
-                    misses.append({"time": previous_timestamp, "diff_time": diff_time})
-                previous_timestamp = timestamp
+            timestamps = timeseries.timestamps
+            diff_times = np.diff(timestamps)
+            for index in np.flatnonzero(diff_times >= max_diff_time).tolist():
+                misses.append({"time": int(timestamps[index]), "diff_time": int(diff_times[index])})
         return misses
 
     @staticmethod
     def aggregate_metrics(start, end, metrics):
-        usages = dict()
-        for metric in metrics:
-            summatory = 0
-            points = list(metrics[metric].items())
-            if points:
-                # Perform the integration through trapezoidal steps
-                previous_time = int(points[0][0])
-                previous_value = points[0][1]
-                max_value = points[0][1]
-                min_value = points[0][1]
-                for point in points[1:]:
-                    time = int(point[0])
-                    value = point[1]
-                    diff_time = time - previous_time
-                    added_value = value + previous_value
-                    summatory += (added_value / 2) * diff_time
-                    max_value = max(max_value, value)
-                    min_value = min(min_value, value)
-                    previous_time = time
-                    previous_value = value
-                average = summatory / (end - start)
-                usages[metric] = dict()
-                usages[metric]["AVG"] = average
-                usages[metric]["SUM"] = summatory
-                usages[metric]["MAX"] = max_value
-                usages[metric]["MIN"] = min_value
-                usages[metric]["DIFF_MAX_MIN"] = usages[metric]["MAX"] - usages[metric]["MIN"]
-                usages[metric]["FIRST"] = points[0][1]
-                usages[metric]["LAST"] = points[-1][1]
-        return usages
+        return aggregate_timeseries(start, end, metrics)
@@ -0,0 +1,70 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+
+import requests
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    # Stops sending queries to a failing OpenTSDB, after 'threshold' consecutive failures the circuit opens and
+    # queries fail right away for 'cooldown' seconds, then a single probe query is let through, if it succeeds the
+    # circuit closes again, otherwise it stays open for another cooldown
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def check(self):
+        # Raise a CircuitOpenError if the query may not be sent
+        if self.threshold <= 0:
+            return
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError("OpenTSDB circuit is open after {0} consecutive failures".format(self.failures))
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and 0 < self.threshold <= self.failures):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
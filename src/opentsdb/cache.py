@@ -0,0 +1,162 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from src.common.config import eprint
+from src.common.timeseries import Timeseries
+
+
+class QueryCache:
+    # Read-through cache of OpenTSDB series, one file per (metric, tag, structure, start, end, downsample) holding
+    # the points as packed little-endian int64 timestamps and float64 values, evicted in LRU order by size
+    MAGIC = b"BDWC"
+    HEADER = struct.Struct("<4sQ")
+
+    def __init__(self, cache_dir, max_size_mb, immutable_after=300):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size = int(float(max_size_mb) * 1024 * 1024)
+        self.immutable_after = int(immutable_after)
+        self.lock = threading.Lock()
+        self.index = None
+        self.total_size = 0
+        self.hits, self.misses, self.stores, self.evictions = 0, 0, 0, 0
+
+    @staticmethod
+    def from_config(config):
+        if config.getCacheEnabled() != "true":
+            return None
+        return QueryCache(config.getCacheDir(), config.getCacheMaxSize(), config.getCacheImmutableAfter())
+
+    def is_cacheable(self, end):
+        # Only windows that are entirely in the past are immutable, otherwise new points may still arrive
+        return int(end) <= time.time() - self.immutable_after
+
+    @staticmethod
+    def get_key(server, metric_name, metric_tag, structure_name, start, end, downsample):
+        key = json.dumps([server, metric_name, metric_tag, structure_name, int(start), int(end), str(downsample)])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def __load_index(self):
+        # The index of cached files is only built the first time it is needed
+        if self.index is not None:
+            return
+        self.index = dict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".bin"):
+                stat = entry.stat()
+                self.index[entry.name] = (stat.st_size, stat.st_mtime)
+                self.total_size += stat.st_size
+
+    def get(self, key):
+        file_name = key + ".bin"
+        file_path = os.path.join(self.cache_dir, file_name)
+        with self.lock:
+            self.__load_index()
+            if file_name not in self.index:
+                self.misses += 1
+                return None
+        try:
+            with open(file_path, "rb") as f:
+                payload = f.read()
+            magic, num_points = self.HEADER.unpack_from(payload)
+            if magic != self.MAGIC:
+                raise ValueError("Invalid cache file")
+            offset = self.HEADER.size
+            # Copy the points out of the (read-only) payload buffer
+            timestamps = np.frombuffer(payload, dtype="<i8", count=num_points, offset=offset).astype(np.int64)
+            values = np.frombuffer(payload, dtype="<f8", count=num_points, offset=offset + 8 * num_points).astype(
+                np.float64)
+        except (OSError, ValueError, struct.error):
+            with self.lock:
+                self.__forget(file_name)
+                self.misses += 1
+            return None
+
+        # Refresh the access time so that the entry is the last one to be evicted
+        now = time.time()
+        try:
+            os.utime(file_path, (now, now))
+        except OSError:
+            pass
+        with self.lock:
+            if file_name in self.index:
+                self.index[file_name] = (self.index[file_name][0], now)
+            self.hits += 1
+        return Timeseries(timestamps, values)
+
+    def put(self, key, timeseries):
+        file_name = key + ".bin"
+        file_path = os.path.join(self.cache_dir, file_name)
+        timestamps = timeseries.timestamps.astype("<i8", copy=False)
+        values = timeseries.values.astype("<f8", copy=False)
+        payload = self.HEADER.pack(self.MAGIC, len(timeseries)) + timestamps.tobytes() + values.tobytes()
+
+        with self.lock:
+            self.__load_index()
+        # Write to a temporary file and rename so that readers never see partial files
+        tmp_path = "{0}.{1}.{2}.tmp".format(file_path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            eprint("Could not store OpenTSDB query result in cache: {0}".format(str(e)))
+            return
+
+        with self.lock:
+            self.__forget(file_name)
+            self.index[file_name] = (len(payload), time.time())
+            self.total_size += len(payload)
+            self.stores += 1
+            self.__evict()
+
+    def __forget(self, file_name):
+        if file_name in self.index:
+            self.total_size -= self.index.pop(file_name)[0]
+
+    def __evict(self):
+        if self.total_size <= self.max_size:
+            return
+        for file_name, _ in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if self.total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                pass
+            self.__forget(file_name)
+            self.evictions += 1
+
+    def get_stats_message(self):
+        lookups = self.hits + self.misses
+        hit_ratio = 100 * self.hits / lookups if lookups else 0
+        return "OpenTSDB cache: {0} hits, {1} misses ({2:.1f}% hit ratio), {3} stored, {4} evicted, " \
+               "{5:.1f} MiB used".format(self.hits, self.misses, hit_ratio, self.stores, self.evictions,
+                                         self.total_size / (1024 * 1024))
@@ -0,0 +1,211 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import codecs
+import json
+import re
+
+import numpy as np
+
+from src.common.timeseries import Timeseries
+
+# The brackets and quotes of the points are dropped and the colons of the 'dps' objects turned into commas, so that
+# the text of the points is a flat list of numbers (timestamp, value, timestamp, value, ...)
+POINTS_TRANSLATION = str.maketrans({"[": None, "]": None, "\"": None, ":": ","})
+ARRAYS_END = re.compile(r"\]\s*\]")
+WHITESPACE = re.compile(r"\s*")
+
+
+class GrowableArray:
+    # Preallocated array that doubles its capacity when full
+    def __init__(self, capacity=0, dtype=np.float64):
+        self.array = np.empty(max(16, int(capacity)), dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        if self.size + values.size > self.array.size:
+            array = np.empty(max(2 * self.array.size, self.size + values.size), dtype=self.array.dtype)
+            array[:self.size] = self.array[:self.size]
+            self.array = array
+        self.array[self.size:self.size + values.size] = values
+        self.size += values.size
+
+    def get(self):
+        return self.array[:self.size]
+
+
+class ResponseDecoder:
+    # Incremental decoder of the responses of the OpenTSDB '/api/query' endpoint, the body is fed as it arrives and
+    # the points of each result, either in the 'dps' object form or in the 'arrays' one, are parsed in bulk straight
+    # into a NumPy buffer, the rest of the fields of the results are decoded as plain JSON
+    # The decoded results hold a 'timeseries' field with a Timeseries instead of the 'dps' field
+    START, RESULT, KEY, POINTS, END = range(5)
+
+    def __init__(self, size_hint=0):
+        self.size_hint = size_hint
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer, self.position = "", 0
+        self.state = self.START
+        self.results, self.result = list(), None
+        self.points, self.points_end = None, None
+
+    def feed(self, data):
+        self.buffer = self.buffer[self.position:] + self.text_decoder.decode(data)
+        self.position = 0
+        self.__parse(final=False)
+
+    def close(self):
+        self.buffer = self.buffer[self.position:] + self.text_decoder.decode(b"", final=True)
+        self.position = 0
+        self.__parse(final=True)
+        if self.state != self.END or self.buffer[self.position:].strip():
+            raise ValueError("Incomplete or malformed OpenTSDB response at '{0}'".format(
+                self.buffer[self.position:self.position + 100]))
+        return self.results
+
+    def __skip_whitespace(self):
+        self.position = WHITESPACE.match(self.buffer, self.position).end()
+        return self.position < len(self.buffer)
+
+    def __decode_value(self, final):
+        # Decode the JSON value at the current position, returns False if it may not have fully arrived yet
+        value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+        if end == len(self.buffer) and not final:
+            return False, None
+        self.position = end
+        return True, value
+
+    def __parse(self, final):
+        while self.__skip_whitespace():
+            char = self.buffer[self.position]
+            if self.state == self.START:
+                if char != "[":
+                    raise ValueError("An OpenTSDB response has to be a list of results")
+                self.state, self.position = self.RESULT, self.position + 1
+
+            elif self.state == self.RESULT:
+                if char == ",":
+                    self.position += 1
+                elif char == "]":
+                    self.state, self.position = self.END, self.position + 1
+                elif char == "{":
+                    self.state, self.position, self.result = self.KEY, self.position + 1, dict()
+                else:
+                    raise ValueError("Unexpected '{0}' in the list of results".format(char))
+
+            elif self.state == self.KEY:
+                if char == ",":
+                    self.position += 1
+                elif char == "}":
+                    self.results.append(self.result)
+                    self.state, self.position, self.result = self.RESULT, self.position + 1, None
+                elif not self.__parse_field(final):
+                    break
+
+            elif self.state == self.POINTS:
+                if not self.__parse_points():
+                    break
+
+            else:
+                raise ValueError("Unexpected '{0}' after the list of results".format(char))
+
+    def __parse_field(self, final):
+        # Parse a whole 'key: value' field, or the start of the points if the key is 'dps', the position is left
+        # untouched if the field is not complete yet
+        start = self.position
+        try:
+            complete, key = self.__decode_value(final)
+            if complete and self.__skip_whitespace() and self.buffer[self.position] == ":":
+                self.position += 1
+                if self.__skip_whitespace():
+                    if key == "dps" and self.buffer[self.position] in "[{":
+                        self.points_end = "]" if self.buffer[self.position] == "[" else "}"
+                        self.points = GrowableArray(2 * self.size_hint)
+                        self.state, self.position = self.POINTS, self.position + 1
+                        return True
+                    complete, value = self.__decode_value(final)
+                    if complete:
+                        self.result[key] = value
+                        return True
+        except json.JSONDecodeError:
+            if final:
+                raise
+        self.position = start
+        return False
+
+    def __parse_points(self):
+        # Parse all the points that have fully arrived, returns False if the end of the points has not arrived yet
+        if self.points_end == "]":
+            # Arrays form, '[[t, v], [t, v], ...]', the points end with the first unpaired bracket
+            if self.buffer[self.position] == ",":
+                self.position += 1
+            if not self.__skip_whitespace():
+                return False
+            if self.buffer[self.position] == "]":
+                end, last = self.position, self.position + 1
+            else:
+                match = ARRAYS_END.search(self.buffer, self.position)
+                end, last = (match.start() + 1, match.end()) if match else (self.buffer.rfind("]") + 1, None)
+        else:
+            # Object form, '{"t": v, "t": v, ...}', the points are parsed up to the last complete one
+            end = self.buffer.find("}", self.position)
+            last = end + 1 if end >= 0 else None
+            if end < 0:
+                end = self.buffer.rfind(",")
+
+        if end > self.position:
+            self.__add_points(self.buffer[self.position:end])
+            self.position = end
+        if last is None:
+            return False
+        self.position = last
+        self.result["timeseries"] = self.__get_timeseries()
+        self.state, self.points = self.KEY, None
+        return True
+
+    def __add_points(self, text):
+        text = text.translate(POINTS_TRANSLATION).strip(", \t\r\n")
+        if not text:
+            return
+        if "null" in text:
+            # Missing values ('null') are not understood by the bulk parser
+            numbers = np.array([np.nan if number.strip() == "null" else float(number) for number in text.split(",")])
+        else:
+            # Depending on the NumPy version, the bulk parser either raises or stops at the first malformed number
+            try:
+                numbers = np.fromstring(text, sep=",")
+            except ValueError:
+                numbers = None
+            if numbers is None or numbers.size != text.count(",") + 1:
+                raise ValueError("Malformed points in the OpenTSDB response at '{0}'".format(text[:100]))
+        self.points.extend(numbers)
+
+    def __get_timeseries(self):
+        numbers = self.points.get()
+        if numbers.size % 2:
+            raise ValueError("Odd number of values in the points of '{0}'".format(self.result.get("metric")))
+        timestamps = numbers[0::2].astype(np.int64)
+        values = numbers[1::2].copy()
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+        return Timeseries(timestamps, values)
@@ -0,0 +1,95 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+
+class Hedger:
+    # Hedged requests, if a request takes longer than a percentile of the latencies of the latest ones, a duplicate
+    # is sent and whichever answers first is used, the number of duplicates is capped to a ratio of the requests
+    WINDOW_SIZE = 1000
+    MIN_SAMPLES = 20
+
+    def __init__(self, percentile=95, min_delay=0.05, budget=0.1, max_workers=16):
+        self.percentile = float(percentile)
+        self.min_delay = float(min_delay)
+        self.budget = float(budget)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="opentsdb-hedge")
+        self.latencies = deque(maxlen=self.WINDOW_SIZE)
+        self.requests, self.hedges, self.wins, self.over_budget = 0, 0, 0, 0
+        self.lock = threading.Lock()
+
+    def get_delay(self):
+        # Time to wait before sending a duplicate, None until enough latencies are known
+        with self.lock:
+            if len(self.latencies) < self.MIN_SAMPLES:
+                return None
+            latencies = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies))
+        return max(self.min_delay, float(np.percentile(latencies, self.percentile)))
+
+    def __take_budget(self):
+        with self.lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                self.over_budget += 1
+                return False
+            self.hedges += 1
+            return True
+
+    def __run_timed(self, function, cancelled):
+        started = time.monotonic()
+        result = function(cancelled)
+        # Every completed request is recorded, a cancelled one stops early so its time is a lower bound of its
+        # latency, leaving the slow requests out would bias the delay low
+        with self.lock:
+            self.latencies.append(time.monotonic() - started)
+        return result
+
+    def run(self, function):
+        # Run 'function', which receives an event that is set once its result is no longer needed, hedging it if
+        # it is slow, the first successful result is returned, otherwise the error of the first request is raised
+        with self.lock:
+            self.requests += 1
+        cancelled = threading.Event()
+        futures = [self.executor.submit(self.__run_timed, function, cancelled)]
+        delay = self.get_delay()
+        if delay is not None and not wait(futures, timeout=delay).done and self.__take_budget():
+            futures.append(self.executor.submit(self.__run_timed, function, cancelled))
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    cancelled.set()
+                    if future is not futures[0]:
+                        with self.lock:
+                            self.wins += 1
+                    return future.result()
+        raise futures[0].exception()
+
+    def get_stats_message(self):
+        return "{0} hedged requests ({1} answered first), {2} not sent as over budget".format(
+            self.hedges, self.wins, self.over_budget)
@@ -0,0 +1,233 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import argparse
+import gzip
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from src.common.config import eprint
+
+# Scale of the synthetic values of each resource, the second field of the metric name (e.g., 'structure.cpu.used')
+RESOURCE_SCALES = {"cpu": 400, "mem": 8192, "energy": 100, "accounting": 20, "tasks": 10}
+DEFAULT_SCALE = 100
+
+DOWNSAMPLE_FUNCTIONS = {"avg": np.add, "sum": np.add, "max": np.maximum, "min": np.minimum}
+
+
+class SyntheticWorkload:
+    # Deterministic timeseries for any metric and structure, a point every 'resolution' seconds (aligned to multiples
+    # of it) whose value only depends on the metric, the structure and the timestamp, so that any time window, no
+    # matter how it is split in queries, always returns the same points
+    def __init__(self, resolution=1, period=600, seed=0):
+        self.resolution = max(1, int(resolution))
+        self.period = period
+        self.seed = seed
+
+    def get_series(self, metric_name, structure_name, start, end):
+        first = -(-int(start) // self.resolution) * self.resolution
+        timestamps = np.arange(first, int(end) + 1, self.resolution, dtype=np.int64)
+
+        splits = metric_name.split(".")
+        scale = RESOURCE_SCALES.get(splits[1] if len(splits) > 1 else "", DEFAULT_SCALE)
+        series_seed = zlib.crc32("{0}/{1}/{2}".format(self.seed, metric_name, structure_name).encode("utf-8"))
+        phase = (series_seed % 1000) / 1000 * 2 * np.pi
+
+        # A slow wave plus a per timestamp pseudo-random noise
+        wave = 0.5 + 0.3 * np.sin(2 * np.pi * timestamps / self.period + phase)
+        noise = np.sin(timestamps * 12.9898 + series_seed % 7919) * 43758.5453
+        noise -= np.floor(noise)
+        return timestamps, np.round(scale * (wave + 0.2 * (noise - 0.5)), 2)
+
+
+def downsample_series(timestamps, values, downsample):
+    # Downsample as OpenTSDB does with a 'Ns-function' specification, the points are grouped in buckets aligned to
+    # multiples of the interval and every bucket is timestamped with its start
+    if not downsample or timestamps.size == 0:
+        return timestamps, values
+    interval, function = downsample.split("-", 1)
+    interval = int(interval.rstrip("s"))
+    buckets = timestamps - timestamps % interval
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    reduced = DOWNSAMPLE_FUNCTIONS[function].reduceat(values, starts)
+    if function == "avg":
+        reduced = reduced / np.diff(np.append(starts, values.size))
+    return buckets[starts], reduced
+
+
+def get_subquery_groups(subquery):
+    # Get the structures requested by the subquery, as the tag key and the groups of tag values whose series are
+    # added together, only the 'literal_or' filter (and plain tags, that OpenTSDB treats as grouped filters) is used
+    filters = list(subquery.get("filters", list()))
+    for tagk, tagv in subquery.get("tags", dict()).items():
+        filters.append(dict(type="literal_or", tagk=tagk, filter=tagv, groupBy=True))
+    if not filters:
+        raise ValueError("Subquery for metric '{0}' has no tag filters".format(subquery["metric"]))
+
+    tag_filter = filters[0]
+    if tag_filter.get("type", "literal_or") != "literal_or":
+        raise ValueError("Unsupported filter type '{0}'".format(tag_filter["type"]))
+    values = tag_filter["filter"].split("|")
+    if tag_filter.get("groupBy", False):
+        return tag_filter["tagk"], [[value] for value in values]
+    else:
+        return tag_filter["tagk"], [values]
+
+
+def get_dps(timestamps, values, arrays=False):
+    # Points of a result, as a dictionary keyed by string timestamps or, in the 'arrays' form, as a list of pairs
+    if arrays:
+        return [list(point) for point in zip(timestamps.tolist(), values.tolist())]
+    return dict(zip(map(str, timestamps.tolist()), values.tolist()))
+
+
+class StandinHTTPServer(ThreadingHTTPServer):
+    # The queue of pending connections is enlarged, as many queries (e.g., time chunks) may arrive at once
+    request_queue_size = 128
+
+
+class OpenTSDBStandin:
+    # Local HTTP server implementing the subset of the OpenTSDB '/api/query' endpoint used by BDWatchdog, with
+    # 'zimsum' aggregation, downsampling and tag filters, and serving the series of a synthetic workload
+    def __init__(self, workload=None, host="127.0.0.1", port=0):
+        self.workload = workload if workload else SyntheticWorkload()
+        self.queries, self.series, self.points = 0, 0, 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                path, _, parameters = self.path.partition("?")
+                if not path.rstrip("/").endswith("/api/query"):
+                    self.send_error(404)
+                    return
+                try:
+                    query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                    arrays = parse_qs(parameters).get("arrays", ["false"])[0] == "true"
+                    body = json.dumps(standin.answer(query, arrays)).encode("utf-8")
+                except (ValueError, KeyError) as e:
+                    self.send_error(400, str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = StandinHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def host(self):
+        return self.server.server_address[0]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        return "http://{0}:{1}".format(self.host, self.port)
+
+    def answer(self, query, arrays=False):
+        start, end = int(query["start"]), int(query["end"])
+        results, num_points = list(), 0
+        for subquery in query["queries"]:
+            if subquery.get("aggregator", "zimsum") != "zimsum":
+                raise ValueError("Unsupported aggregator '{0}'".format(subquery["aggregator"]))
+            tagk, groups = get_subquery_groups(subquery)
+            for group in groups:
+                # Every series of the group is downsampled and then they are added, filling with zeros ('zimsum')
+                group_series = [downsample_series(*self.workload.get_series(subquery["metric"], value, start, end),
+                                                  subquery.get("downsample")) for value in group]
+                timestamps = np.unique(np.concatenate([t for t, _ in group_series]))
+                values = np.zeros(timestamps.size)
+                for t, v in group_series:
+                    values[np.searchsorted(timestamps, t)] += v
+                if timestamps.size == 0:
+                    continue
+
+                results.append(dict(metric=subquery["metric"],
+                                    tags={tagk: group[0]} if len(group) == 1 else dict(),
+                                    aggregateTags=[] if len(group) == 1 else [tagk],
+                                    dps=get_dps(timestamps, values, arrays)))
+                num_points += timestamps.size
+
+        with self.lock:
+            self.queries += 1
+            self.series += len(results)
+            self.points += num_points
+        return results
+
+    def get_stats_message(self):
+        return "OpenTSDB stand-in served {0} queries, {1} series and {2} points".format(
+            self.queries, self.series, self.points)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="opentsdb-standin", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve synthetic timeseries through a local OpenTSDB stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4242)
+    parser.add_argument("--resolution", type=int, default=1, help="Seconds between the points of the raw series")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    standin = OpenTSDBStandin(SyntheticWorkload(args.resolution, seed=args.seed), args.host, args.port)
+    eprint("OpenTSDB stand-in listening on {0}".format(standin.url))
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        eprint(standin.get_stats_message())
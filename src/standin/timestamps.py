@@ -0,0 +1,60 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+
+import copy
+
+
+def generate_experiment(experiment_name, username="root", num_tests=3, test_duration=600, start_time=1600000000,
+                        tests_gap=60):
+    # Experiment and tests documents as stored by TimestampsSnitch, with the tests one after another
+    tests = list()
+    test_start = start_time
+    for i in range(num_tests):
+        tests.append(dict(experiment_id=experiment_name, username=username, test_name="{0}.test".format(i),
+                          start_time=test_start, end_time=test_start + test_duration))
+        test_start += test_duration + tests_gap
+    experiment = dict(experiment_id=experiment_name, username=username, start_time=start_time,
+                      end_time=test_start - tests_gap)
+    return experiment, tests
+
+
+class InMemoryTimestampAgent:
+    # Replacement of the MongoDBTimestampAgent of TimestampsSnitch, keeping the documents in memory, it only implements
+    # the methods used to report experiments
+    def __init__(self):
+        self.experiments = dict()
+        self.tests = dict()
+
+    def add_experiment(self, experiment, tests):
+        key = (experiment["experiment_id"], experiment["username"])
+        self.experiments[key] = experiment
+        self.tests[key] = list(tests)
+
+    def get_experiment(self, experiment_name, username):
+        # Copies are returned as the documents are modified when reported (e.g., their duration)
+        experiment = self.experiments.get((experiment_name, username))
+        return copy.deepcopy(experiment) if experiment else None
+
+    def get_experiment_tests(self, experiment_id, username):
+        return copy.deepcopy(self.tests.get((experiment_id, username), list()))
@@ -0,0 +1,49 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+
+import pytest
+
+# The tests import the report generator from the repository, without it having to be in the PYTHONPATH
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.common.config import OpenTSDBConfig
+from src.standin.opentsdb import OpenTSDBStandin
+
+
+@pytest.fixture(scope="module")
+def opentsdb_standin():
+    with OpenTSDBStandin() as standin:
+        yield standin
+
+
+@pytest.fixture
+def opentsdb_config(opentsdb_standin):
+    # Factory of client configs pointing to the stand-in, without the on-disk cache
+    def get_config(**values):
+        config = OpenTSDBConfig()
+        config.config.update(OPENTSDB_IP=opentsdb_standin.host, OPENTSDB_PORT=opentsdb_standin.port,
+                             OPENTSDB_CACHE_ENABLED="false")
+        config.config.update(values)
+        return config
+    return get_config
@@ -0,0 +1,96 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+
+from src.common.aggregation import AGGREGATIONS, aggregate_structures, aggregate_timeseries, compute_aggregations
+from src.common.timeseries import Timeseries
+
+
+def baseline_aggregate_metrics(start, end, metrics):
+    # Point by point aggregation over dps dictionaries, as BDWatchdog.aggregate_metrics originally did it
+    usages = dict()
+    for metric in metrics:
+        summatory = 0
+        points = list(metrics[metric].items())
+        if points:
+            previous_time, previous_value = int(points[0][0]), points[0][1]
+            max_value, min_value = points[0][1], points[0][1]
+            for point in points[1:]:
+                time, value = int(point[0]), point[1]
+                summatory += ((value + previous_value) / 2) * (time - previous_time)
+                max_value, min_value = max(max_value, value), min(min_value, value)
+                previous_time, previous_value = time, value
+            usages[metric] = {"AVG": summatory / (end - start), "SUM": summatory, "MAX": max_value,
+                              "MIN": min_value, "DIFF_MAX_MIN": max_value - min_value,
+                              "FIRST": points[0][1], "LAST": points[-1][1]}
+    return usages
+
+
+def random_dps(rng, start, num_points):
+    timestamps = start + np.sort(rng.choice(np.arange(0, 10 * num_points, 5), size=num_points, replace=False))
+    return {str(t): float(v) for t, v in zip(timestamps, rng.uniform(-50, 400, size=num_points).round(3))}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_aggregates_match_baseline(seed):
+    rng = np.random.default_rng(seed)
+    start, end = 1600000000, 1600003600
+    metrics = {"metric{0}".format(i): random_dps(rng, start, int(rng.integers(1, 200))) for i in range(8)}
+    metrics["empty"] = dict()
+
+    expected = baseline_aggregate_metrics(start, end, metrics)
+    result = aggregate_timeseries(start, end, {name: Timeseries.from_dps(dps) for name, dps in metrics.items()})
+    assert result.keys() == expected.keys()
+    for metric in expected:
+        assert result[metric].keys() == expected[metric].keys()
+        for aggregation in AGGREGATIONS:
+            assert result[metric][aggregation] == pytest.approx(expected[metric][aggregation], rel=1e-12, abs=1e-9)
+
+
+def test_single_point_series():
+    result = aggregate_timeseries(0, 10, {"metric": Timeseries([5], [3.0])})["metric"]
+    assert result == {"AVG": 0.0, "SUM": 0.0, "MAX": 3.0, "MIN": 3.0, "DIFF_MAX_MIN": 0.0, "FIRST": 3.0, "LAST": 3.0}
+
+
+def test_segments_do_not_leak_into_each_other():
+    # The step between the last point of a series and the first point of the next one must not be integrated
+    first, second = Timeseries([0, 10], [1.0, 1.0]), Timeseries([100, 110], [5.0, 5.0])
+    aggregations = compute_aggregations(0, 10, [first, second])
+    assert aggregations[:, AGGREGATIONS.index("SUM")].tolist() == [10.0, 50.0]
+    assert aggregations[:, AGGREGATIONS.index("FIRST")].tolist() == [1.0, 5.0]
+    assert aggregations[:, AGGREGATIONS.index("LAST")].tolist() == [1.0, 5.0]
+
+
+def test_empty_series_are_rejected():
+    with pytest.raises(ValueError):
+        compute_aggregations(0, 10, [Timeseries([0], [1.0]), Timeseries()])
+    assert compute_aggregations(0, 10, []).shape == (0, len(AGGREGATIONS))
+
+
+def test_aggregate_structures_nests_the_results():
+    structures = {"node0": {"cpu": Timeseries([0, 10], [2.0, 4.0]), "mem": Timeseries()}, "node1": dict()}
+    aggregates = aggregate_structures(0, 10, structures)
+    assert aggregates.keys() == {"node0", "node1"}
+    assert aggregates["node0"].keys() == {"cpu"}
+    assert aggregates["node0"]["cpu"]["SUM"] == 30.0
+    assert aggregates["node1"] == dict()
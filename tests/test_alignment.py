@@ -0,0 +1,73 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+
+from src.common.alignment import align_timeseries, get_time_grid, resample_timeseries, sum_timeseries
+from src.common.timeseries import Timeseries
+
+FIRST = Timeseries([0, 10, 20], [1.0, 3.0, 5.0])
+SECOND = Timeseries([10, 15, 30], [10.0, 20.0, 40.0])
+
+
+def test_grid_is_the_union_of_the_timestamps():
+    assert get_time_grid([FIRST, Timeseries(), SECOND]).tolist() == [0, 10, 15, 20, 30]
+    assert get_time_grid([Timeseries()]).size == 0
+
+
+@pytest.mark.parametrize("fill_policy, expected", [
+    ("zero", [1.0, 3.0, 0.0, 5.0, 0.0]),
+    ("hold", [1.0, 3.0, 3.0, 5.0, 0.0]),
+    ("linear", [1.0, 3.0, 4.0, 5.0, 0.0]),
+])
+def test_resample_fill_policies(fill_policy, expected):
+    grid = np.array([0, 10, 15, 20, 30])
+    assert resample_timeseries(FIRST, grid, fill_policy).tolist() == expected
+
+
+def test_resample_nan_policy():
+    values = resample_timeseries(FIRST, np.array([0, 15]), "nan")
+    assert values[0] == 1.0 and np.isnan(values[1])
+
+
+def test_resample_unknown_policy():
+    with pytest.raises(ValueError):
+        resample_timeseries(FIRST, np.array([0]), "cubic")
+
+
+def test_align_has_one_row_per_series():
+    grid, matrix = align_timeseries([FIRST, SECOND, Timeseries()])
+    assert grid.tolist() == [0, 10, 15, 20, 30]
+    assert matrix.shape == (3, 5)
+    assert not matrix[2].any()
+
+
+def test_sum_with_zero_fill_keeps_the_points_of_every_series():
+    # Unlike the original point by point sum, the points missing from the first series are not dropped
+    total = sum_timeseries([FIRST, SECOND], "zero")
+    assert total.timestamps.tolist() == [0, 10, 15, 20, 30]
+    assert total.values.tolist() == [1.0, 13.0, 20.0, 5.0, 40.0]
+
+
+def test_sum_of_nothing_is_empty():
+    assert not sum_timeseries([])
+    assert not sum_timeseries([Timeseries(), Timeseries()])
@@ -0,0 +1,130 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import socket
+
+import pytest
+import requests
+
+from src.opentsdb import breaker as breaker_module
+from src.opentsdb.bdwatchdog import BDWatchdog
+from src.opentsdb.breaker import CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module.time, "monotonic", clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.check()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_open_circuit_errors_are_connection_errors():
+    assert issubclass(CircuitOpenError, requests.ConnectionError)
+
+
+def test_single_probe_after_cooldown_closes_on_success(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now += 1
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the probe is let through until it finishes
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+    breaker.check()
+
+
+def test_failed_probe_opens_again_for_another_cooldown(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.now += 5
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_zero_threshold_disables_the_breaker(clock):
+    breaker = CircuitBreaker(threshold=0, cooldown=10)
+    for _ in range(100):
+        breaker.record_failure()
+        breaker.check()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.times_opened == 0
+
+
+def get_closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_client_stops_querying_an_unreachable_server(opentsdb_config):
+    config = opentsdb_config(OPENTSDB_IP="127.0.0.1", OPENTSDB_PORT=get_closed_port(), OPENTSDB_MAX_TRIES=2,
+                             OPENTSDB_BACKOFF_BASE=0, OPENTSDB_BREAKER_THRESHOLD=2, OPENTSDB_BREAKER_COOLDOWN=60)
+    client = BDWatchdog(config)
+    query = client.timeseries_query("node0", 1600000000, 1600000100, [("structure.cpu.used", "structure")])
+    with pytest.raises(requests.ConnectionError) as error:
+        client.get_points(query)
+    assert not isinstance(error.value, CircuitOpenError)
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    # Once open, queries fail right away without being sent
+    with pytest.raises(CircuitOpenError):
+        client.get_points(query)
+    assert (client.requests, client.retries, client.failures) == (2, 1, 2)
@@ -0,0 +1,78 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+
+from src.lineplotting.decimation import decimate_line, lttb
+
+
+def get_line(size, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(size, dtype=np.float64) * 5
+    return x, np.cumsum(rng.normal(size=size))
+
+
+@pytest.mark.parametrize("size, num_points", [(1000, 3), (1000, 100), (1001, 250), (10007, 999), (50, 49)])
+def test_lttb_size_and_endpoints(size, num_points):
+    x, y = get_line(size)
+    dx, dy = lttb(x, y, num_points)
+    assert dx.size == dy.size == num_points
+    assert (dx[0], dy[0]) == (x[0], y[0])
+    assert (dx[-1], dy[-1]) == (x[-1], y[-1])
+    # The points kept are points of the line, in their original order
+    assert np.all(np.diff(dx) > 0)
+    positions = np.searchsorted(x, dx)
+    assert np.array_equal(x[positions], dx) and np.array_equal(y[positions], dy)
+
+
+@pytest.mark.parametrize("num_points", [0, 2, 100, 200])
+def test_lttb_is_a_no_op_when_not_reducing(num_points):
+    x, y = get_line(100)
+    dx, dy = lttb(x, y, num_points)
+    assert dx is x and dy is y
+
+
+def test_lttb_keeps_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[[137, 512, 873]] = [50, -40, 30]
+    dx, dy = lttb(x, y, 20)
+    for peak in (137, 512, 873):
+        assert peak in dx
+
+
+def test_decimate_line_keeps_the_gaps():
+    x, y = get_line(3000)
+    y[[1000, 2000]] = np.nan
+    dx, dy = decimate_line(x, y, 300)
+    # The share of points of every segment is rounded, adding at most one point per segment to the gap markers
+    assert dx.size <= 300 + 3 + 2
+    assert np.array_equal(dx[np.isnan(dy)], x[[1000, 2000]])
+    # Every segment keeps its own endpoints
+    for point in (0, 999, 1001, 1999, 2001, 2999):
+        assert x[point] in dx
+
+
+def test_decimate_line_is_a_no_op_for_short_lines():
+    x, y = get_line(100)
+    assert decimate_line(x, y, 0)[0] is x
+    assert decimate_line(x, y, 100)[0] is x
@@ -0,0 +1,119 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import json
+
+import numpy as np
+import pytest
+
+from src.common.timeseries import Timeseries
+from src.opentsdb.decoding import ResponseDecoder
+
+
+def get_response(standin, arrays, num_structures=3, start=1600000003, end=1600003600):
+    query = {"start": start, "end": end, "queries": [
+        {"aggregator": "zimsum", "metric": metric, "tags": {"structure": "|".join(
+            "node{0}".format(i) for i in range(num_structures))}, "downsample": "5s-avg"}
+        for metric in ("structure.cpu.used", "structure.mem.used")]}
+    return json.dumps(standin.answer(query, arrays)).encode("utf-8")
+
+
+def decode(body, chunk_size=None, size_hint=0):
+    decoder = ResponseDecoder(size_hint)
+    chunk_size = chunk_size if chunk_size else len(body)
+    for i in range(0, len(body), chunk_size):
+        decoder.feed(body[i:i + chunk_size])
+    return decoder.close()
+
+
+def assert_same_results(results, body):
+    expected = json.loads(body)
+    assert len(results) == len(expected)
+    for result, expected_result in zip(results, expected):
+        expected_timeseries = Timeseries.from_dps(expected_result.pop("dps"))
+        timeseries = result.pop("timeseries")
+        assert result == expected_result
+        assert timeseries.timestamps.tolist() == expected_timeseries.timestamps.tolist()
+        assert timeseries.values.tolist() == expected_timeseries.values.tolist()
+
+
+@pytest.mark.parametrize("arrays", [False, True])
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 64, 1000, 4096])
+def test_decoder_matches_json_for_any_chunking(opentsdb_standin, arrays, chunk_size):
+    body = get_response(opentsdb_standin, arrays)
+    assert_same_results(decode(body, chunk_size), body)
+
+
+@pytest.mark.parametrize("arrays", [False, True])
+def test_decoder_matches_json_for_every_split_point(opentsdb_standin, arrays):
+    body = get_response(opentsdb_standin, arrays, num_structures=1, start=1600000000, end=1600000060)
+    for split in range(len(body) + 1):
+        decoder = ResponseDecoder()
+        decoder.feed(body[:split])
+        decoder.feed(body[split:])
+        assert_same_results(decoder.close(), body)
+
+
+@pytest.mark.parametrize("size_hint", [0, 1, 100000])
+def test_size_hint_does_not_change_the_result(opentsdb_standin, size_hint):
+    body = get_response(opentsdb_standin, True)
+    assert_same_results(decode(body, 333, size_hint), body)
+
+
+@pytest.mark.parametrize("dps", ['{"10": 1.5, "15": null, "20": 2}', '[[10, 1.5], [15, null], [20, 2]]'])
+@pytest.mark.parametrize("chunk_size", [None, 1, 5])
+def test_null_values_are_nan(dps, chunk_size):
+    body = '[{"metric": "m", "tags": {}, "aggregateTags": [], "dps": ' + dps + '}]'
+    timeseries = decode(body.encode("utf-8"), chunk_size)[0]["timeseries"]
+    assert timeseries.timestamps.tolist() == [10, 15, 20]
+    assert timeseries.values[0] == 1.5 and np.isnan(timeseries.values[1]) and timeseries.values[2] == 2.0
+
+
+@pytest.mark.parametrize("dps", ['{}', '[]', '{ }', '[ ]'])
+def test_empty_points(dps):
+    body = '[{"metric": "m", "dps": ' + dps + ', "tags": {"host": "x"}}]'
+    results = decode(body.encode("utf-8"), 3)
+    assert len(results[0]["timeseries"]) == 0
+    assert results[0]["tags"] == {"host": "x"}
+
+
+def test_unsorted_points_are_sorted():
+    results = decode(b'[{"metric": "m", "dps": {"20": 2, "10": 1}}]')
+    assert results[0]["timeseries"].timestamps.tolist() == [10, 20]
+    assert results[0]["timeseries"].values.tolist() == [1.0, 2.0]
+
+
+def test_multibyte_characters_split_across_chunks():
+    body = '[{"metric": "m", "tags": {"user": "álvaro ☃"}, "dps": [[10, 1]]}]'.encode("utf-8")
+    for chunk_size in range(1, 8):
+        assert decode(body, chunk_size)[0]["tags"]["user"] == "álvaro ☃"
+
+
+def test_empty_response():
+    assert decode(b" [ ] ", 1) == []
+
+
+@pytest.mark.parametrize("body", [b"", b"[", b'[{"metric": "m", "dps": {"10": 1', b'{"error": "x"}', b"[1]",
+                                  b'[{"metric": "m", "dps": {"10": 1, "x": 2}}]', b'[{"metric": "m", "dps": [[10]]}]',
+                                  b"[] []"])
+def test_malformed_responses_raise(body):
+    with pytest.raises(ValueError):
+        decode(body)
@@ -0,0 +1,116 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+
+from src.common.derived import DerivedMetric, apply_derived_metrics, parse_derived_metrics
+from src.common.timeseries import Timeseries
+
+
+def get_structure():
+    return {"proc.cpu.user": Timeseries([0, 5, 10], [10.0, 20.0, 30.0]),
+            "proc.cpu.kernel": Timeseries([0, 5, 10], [1.0, 2.0, 3.0]),
+            "structure.cpu.current": Timeseries([0, 5, 10], [100.0, 0.0, 200.0])}
+
+
+def test_usage_sum_matches_the_original_point_by_point_sum():
+    structure = get_structure()
+    assert apply_derived_metrics(structure, [("structure.cpu.used", "proc.cpu.user + proc.cpu.kernel")]) == \
+        ["structure.cpu.used"]
+    used = structure["structure.cpu.used"]
+    assert used.timestamps.tolist() == [0, 5, 10]
+    assert used.values.tolist() == [11.0, 22.0, 33.0]
+
+
+def test_metrics_are_collected_once_in_order():
+    metric = DerivedMetric("x", "proc.cpu.user * 2 + proc.cpu.kernel - proc.cpu.user")
+    assert metric.metrics == ["proc.cpu.user", "proc.cpu.kernel"]
+
+
+def test_functions_constants_and_unary_operators():
+    structure = get_structure()
+    derived = [("clamped", "clamp(proc.cpu.user, 15, 25)"), ("lowest", "min(proc.cpu.user, 25)"),
+               ("highest", "max(proc.cpu.kernel, 2)"), ("absolute", "abs(-proc.cpu.kernel)"), ("constant", "4")]
+    apply_derived_metrics(structure, derived)
+    assert structure["clamped"].values.tolist() == [15.0, 20.0, 25.0]
+    assert structure["lowest"].values.tolist() == [10.0, 20.0, 25.0]
+    assert structure["highest"].values.tolist() == [2.0, 2.0, 3.0]
+    assert structure["absolute"].values.tolist() == [1.0, 2.0, 3.0]
+    # A constant expression references no metric, so it has no grid to be evaluated on
+    assert len(structure["constant"]) == 0
+
+
+def test_undefined_points_are_dropped():
+    structure = get_structure()
+    apply_derived_metrics(structure, [("ratio", "100 * (proc.cpu.user + proc.cpu.kernel) / structure.cpu.current")])
+    assert structure["ratio"].timestamps.tolist() == [0, 10]
+    assert structure["ratio"].values.tolist() == [11.0, 16.5]
+
+
+def test_quoted_metric_names():
+    structure = {"sys.cpu-energy": Timeseries([0], [2.0])}
+    apply_derived_metrics(structure, [("energy", "'sys.cpu-energy' * 3")])
+    assert structure["energy"].values.tolist() == [6.0]
+
+
+def test_derived_metrics_can_use_previous_ones_and_never_overwrite():
+    structure = get_structure()
+    retrieved = structure["structure.cpu.current"]
+    derived = [("structure.cpu.used", "proc.cpu.user + proc.cpu.kernel"),
+               ("structure.cpu.double", "structure.cpu.used * 2"),
+               ("structure.cpu.current", "proc.cpu.user"),
+               ("structure.mem.used", "proc.mem.resident")]
+    assert apply_derived_metrics(structure, derived) == ["structure.cpu.used", "structure.cpu.double"]
+    assert structure["structure.cpu.double"].values.tolist() == [22.0, 44.0, 66.0]
+    assert structure["structure.cpu.current"] is retrieved
+    assert "structure.mem.used" not in structure
+
+
+def test_series_with_different_timestamps_are_aligned():
+    structure = {"a": Timeseries([0, 10], [1.0, 3.0]), "b": Timeseries([5, 10], [10.0, 20.0])}
+    apply_derived_metrics(structure, [("zero", "a + b")], "zero")
+    apply_derived_metrics(structure, [("linear", "a + b")], "linear")
+    assert structure["zero"].timestamps.tolist() == [0, 5, 10]
+    assert structure["zero"].values.tolist() == [1.0, 10.0, 23.0]
+    assert structure["linear"].values.tolist() == [1.0, 12.0, 23.0]
+
+
+def test_empty_inputs_give_an_empty_series():
+    structure = {"a": Timeseries(), "b": Timeseries()}
+    apply_derived_metrics(structure, [("c", "a + b")])
+    assert isinstance(structure["c"], Timeseries) and not structure["c"]
+
+
+@pytest.mark.parametrize("expression", ["a +", "a ** 2", "a < b", "sqrt(a)", "clamp(a, 1)", "a.b[0]", "lambda: 1"])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        DerivedMetric("x", expression)
+
+
+def test_parse_declarations():
+    declarations = " structure.cpu.util = 100 * structure.cpu.used / structure.cpu.current ; ; x = a - b "
+    assert parse_derived_metrics(declarations) == [
+        ("structure.cpu.util", "100 * structure.cpu.used / structure.cpu.current"), ("x", "a - b")]
+    with pytest.raises(ValueError):
+        parse_derived_metrics("structure.cpu.util")
+    with pytest.raises(ValueError):
+        parse_derived_metrics("x = a +")
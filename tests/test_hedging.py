@@ -0,0 +1,131 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+
+import pytest
+
+from src.opentsdb.hedging import Hedger
+
+
+class Requests:
+    # Function for the hedger whose first call behaves as 'first' and the rest as 'others'
+    def __init__(self, first, others):
+        self.first, self.others = first, others
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, cancelled):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        return self.first(cancelled) if call == 1 else self.others(cancelled)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def get_warm_hedger(**kwargs):
+    hedger = Hedger(**kwargs)
+    for _ in range(Hedger.MIN_SAMPLES):
+        assert hedger.run(lambda cancelled: "warm-up") == "warm-up"
+    return hedger
+
+
+def test_no_hedging_until_enough_latencies_are_known():
+    hedger = Hedger(min_delay=0.01)
+    for _ in range(Hedger.MIN_SAMPLES - 1):
+        hedger.run(lambda cancelled: None)
+    assert hedger.get_delay() is None
+    hedger.run(lambda cancelled: None)
+    assert hedger.get_delay() >= 0.01
+
+
+def test_delay_is_a_percentile_with_a_minimum():
+    hedger = Hedger(percentile=50, min_delay=0.01)
+    hedger.latencies.extend([0.1] * 10 + [0.3] * 10)
+    assert hedger.get_delay() == pytest.approx(0.2)
+    hedger.min_delay = 1
+    assert hedger.get_delay() == 1
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    hedger = get_warm_hedger(min_delay=0.01, budget=0.5)
+    loser_cancelled = threading.Event()
+
+    def slow(cancelled):
+        if cancelled.wait(5):
+            loser_cancelled.set()
+        return "slow"
+
+    assert hedger.run(Requests(slow, lambda cancelled: "fast")) == "fast"
+    assert (hedger.hedges, hedger.wins, hedger.over_budget) == (1, 1, 0)
+    assert loser_cancelled.wait(5)
+    # The cancelled request is recorded too, otherwise the delay would only learn from the fast requests
+    assert wait_for(lambda: len(hedger.latencies) == Hedger.MIN_SAMPLES + 2)
+
+
+def test_hedges_are_capped_by_the_budget():
+    hedger = get_warm_hedger(min_delay=0.01, budget=0)
+    requests = Requests(lambda cancelled: time.sleep(0.1) or "slow", lambda cancelled: "fast")
+    assert hedger.run(requests) == "slow"
+    assert requests.calls == 1
+    assert (hedger.hedges, hedger.over_budget) == (0, 1)
+
+
+def test_hedge_answers_when_the_first_request_fails():
+    hedger = get_warm_hedger(min_delay=0.01, budget=0.5)
+
+    def failing(cancelled):
+        time.sleep(0.1)
+        raise IOError("first")
+
+    assert hedger.run(Requests(failing, lambda cancelled: "hedge")) == "hedge"
+
+
+def test_error_of_the_first_request_is_raised_when_all_fail():
+    hedger = get_warm_hedger(min_delay=0.01, budget=0.5)
+
+    def failing_first(cancelled):
+        time.sleep(0.1)
+        raise IOError("first")
+
+    def failing_hedge(cancelled):
+        raise IOError("hedge")
+
+    with pytest.raises(IOError, match="first"):
+        hedger.run(Requests(failing_first, failing_hedge))
+    # Failed requests do not count as latencies
+    assert len(hedger.latencies) == Hedger.MIN_SAMPLES
+
+
+def test_fast_requests_are_not_hedged():
+    hedger = get_warm_hedger(min_delay=1, budget=1)
+    requests = Requests(lambda cancelled: "first", lambda cancelled: "hedge")
+    for _ in range(10):
+        requests.calls = 0
+        assert hedger.run(requests) == "first"
+    assert hedger.hedges == 0
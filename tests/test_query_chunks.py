@@ -0,0 +1,77 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import pytest
+
+from src.common.timeseries import Timeseries
+from src.opentsdb.async_bdwatchdog import AsyncBDWatchdog
+from src.opentsdb.bdwatchdog import BDWatchdog
+
+METRICS = [("structure.cpu.used", "structure"), ("structure.mem.used", "structure")]
+
+
+@pytest.mark.parametrize("start, end, downsample, chunk_seconds", [
+    (1600000003, 1600036010, 5, 3600),
+    (1600000000, 1600007200, 5, 3600),
+    (1600000001, 1600010001, 7, 1000),
+    (1600000003, 1600000500, 5, 100),
+])
+def test_chunks_cover_the_window_on_downsample_boundaries(start, end, downsample, chunk_seconds):
+    chunks = BDWatchdog.get_query_chunks(start, end, downsample, chunk_seconds)
+    assert len(chunks) > 1
+    assert chunks[0][0] == start and chunks[-1][1] == end
+    for (_, previous_end), (next_start, _) in zip(chunks, chunks[1:]):
+        # Every chunk ends a second before the next one starts, on a multiple of the downsample
+        assert next_start == previous_end + 1
+        assert next_start % downsample == 0
+    for chunk_start, chunk_end in chunks:
+        assert chunk_start <= chunk_end
+
+
+@pytest.mark.parametrize("chunk_seconds", [0, 3600, 7200])
+def test_short_windows_are_not_split(chunk_seconds):
+    assert BDWatchdog.get_query_chunks(1600000000, 1600003600, 5, chunk_seconds) == [(1600000000, 1600003600)]
+
+
+def test_join_chunks_concatenates_every_metric():
+    chunks = [{"cpu": Timeseries([0, 5], [1.0, 2.0]), "mem": Timeseries()},
+              {"cpu": Timeseries([10], [3.0]), "mem": Timeseries([10], [4.0])}]
+    joined = AsyncBDWatchdog.join_chunks(chunks)
+    assert joined["cpu"].timestamps.tolist() == [0, 5, 10]
+    assert joined["mem"].values.tolist() == [4.0]
+    assert AsyncBDWatchdog.join_chunks(chunks[:1]) is chunks[0]
+
+
+def get_async_timeseries(config, structures, start, end):
+    client = AsyncBDWatchdog(config)
+    return client.run([client.get_structures_timeseries(structures, start, end, METRICS)])[0]
+
+
+def test_chunked_retrieval_returns_the_same_series(opentsdb_config):
+    structures = ["node0", "node1"]
+    start, end = 1600000003, 1600010007
+    whole = get_async_timeseries(opentsdb_config(OPENTSDB_QUERY_CHUNK_SECONDS=0), structures, start, end)
+    chunked = get_async_timeseries(opentsdb_config(OPENTSDB_QUERY_CHUNK_SECONDS=1000), structures, start, end)
+    for structure in structures:
+        for metric, _ in METRICS:
+            assert len(whole[structure][metric]) > 0
+            assert whole[structure][metric].timestamps.tolist() == chunked[structure][metric].timestamps.tolist()
+            assert whole[structure][metric].values.tolist() == chunked[structure][metric].values.tolist()
@@ -0,0 +1,70 @@
+# Copyright (c) 2019 Universidade da Coruña
+# Authors:
+#     - Jonatan Enes [main](jonatan.enes@udc.es, jonatan.enes.alvarez@gmail.com)
+#     - Roberto R. Expósito
+#     - Juan Touriño
+#
+# This file is part of the BDWatchdog framework, from
+# now on referred to as BDWatchdog.
+#
+# BDWatchdog is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3
+# of the License, or (at your option) any later version.
+#
+# BDWatchdog is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with BDWatchdog. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+
+from src.common.timeseries import Timeseries
+
+
+def test_from_dps_dictionary_and_arrays_forms_are_equal():
+    dps = {"1600000010": 2.0, "1600000000": 1.0, "1600000005": 1.5}
+    from_dict = Timeseries.from_dps(dps)
+    from_arrays = Timeseries.from_dps([[1600000000, 1.0], [1600000005, 1.5], [1600000010, 2.0]])
+    for series in (from_dict, from_arrays):
+        assert series.timestamps.tolist() == [1600000000, 1600000005, 1600000010]
+        assert series.values.tolist() == [1.0, 1.5, 2.0]
+        assert series.timestamps.dtype == np.int64 and series.values.dtype == np.float64
+
+
+def test_from_dps_empty():
+    assert len(Timeseries.from_dps({})) == 0
+    assert len(Timeseries.from_dps([])) == 0
+    assert not Timeseries()
+
+
+def test_to_dps_round_trip():
+    dps = {"1600000000": 1.0, "1600000005": 2.5}
+    assert Timeseries.from_dps(dps).to_dps() == dps
+
+
+def test_concatenate_keeps_last_point_of_repeated_timestamps():
+    first = Timeseries([0, 5, 10], [1.0, 2.0, 3.0])
+    second = Timeseries([10, 15], [4.0, 5.0])
+    joined = Timeseries.concatenate([first, Timeseries(), second])
+    assert joined.timestamps.tolist() == [0, 5, 10, 15]
+    assert joined.values.tolist() == [1.0, 2.0, 4.0, 5.0]
+    # The pieces may come in any order, the one given last wins
+    joined = Timeseries.concatenate([second, first])
+    assert joined.timestamps.tolist() == [0, 5, 10, 15]
+    assert joined.values.tolist() == [1.0, 2.0, 3.0, 5.0]
+
+
+def test_lookup_fills_missing_timestamps():
+    series = Timeseries([0, 5, 10], [1.0, 2.0, 3.0])
+    assert series.lookup(np.array([0, 3, 10, 20]), fill=0).tolist() == [1.0, 0.0, 3.0, 0.0]
+    assert np.isnan(Timeseries().lookup(np.array([0]))).all()
+
+
+def test_copy_is_independent():
+    series = Timeseries([0, 5], [1.0, 2.0])
+    copied = series.copy()
+    copied.values[0] = 10
+    assert series.values[0] == 1.0